@@ -0,0 +1,58 @@
+import time
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    # CPython (execução no computador): milissegundos desde a importação
+    _start = time.monotonic()
+
+    def ticks_ms():
+        return int((time.monotonic() - _start) * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+# Marcos já registrados (cada evento é registrado apenas uma vez)
+_marks = {}
+
+# Hook opcional chamado a cada marco: hook(evento, ms_desde_reset)
+_hook = None
+
+
+def set_hook(hook):
+    """
+    Define uma função chamada a cada novo marco do boot.
+
+    Args:
+        hook (callable): Função hook(evento, ms) ou None para desativar
+    """
+    global _hook
+    _hook = hook
+
+
+def mark(event):
+    """
+    Registra um marco do boot em milissegundos desde o reset.
+
+    O ticks_ms() do MicroPython começa a contar no reset da placa, então o
+    valor registrado já é o tempo desde o reset. Chamadas repetidas para o
+    mesmo evento são ignoradas, o que permite chamar mark() no caminho quente.
+
+    Args:
+        event (str): Nome do evento ('ap_up', 'first_dns', 'first_http', ...)
+    """
+    if event in _marks:
+        return
+    ms = ticks_ms()
+    _marks[event] = ms
+    print(f"[boot] {event}: {ms} ms")
+    if _hook:
+        try:
+            _hook(event, ms)
+        except Exception as e:
+            print(f"Erro no hook de boot: {e}")
+
+
+def marks():
+    """Retorna uma cópia dos marcos registrados até agora."""
+    return dict(_marks)
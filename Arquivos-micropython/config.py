@@ -0,0 +1,54 @@
+# Configurações
+AP_SSID = 'ESP32-CHAT'
+AP_PASSWORD = '12345678'
+AP_IP = '192.168.4.1'
+MAX_CONNECTIONS = 5  # Limite máximo de conexões WebSocket simultâneas
+FRAGMENT_SIZE = 5 * 1024  # 5KB para cada fragmento
+ASSET_CACHE_BUDGET = 40 * 1024  # Bytes máximos do cache de arquivos em RAM (loader + index + fragmentos do chat.html)
+ASSET_CACHE_PINNED = ('loader.html', 'fragments/index.txt')  # Pedidos por todo celular: têm prioridade no cache
+ASSET_CACHE_LOW_HEAP = 32 * 1024  # Abaixo desta memória livre o cache descarta entradas
+WS_FLUSH_WINDOW_MS = 20  # Janela para juntar frames de um cliente em um único send (0 desativa)
+WS_PENDING_LIMIT = 32 * 1024  # Bytes pendentes máximos por cliente antes de desconectá-lo
+STATIC_THREAD = False  # True: DNS e HTTP estático em uma thread, WebSocket no laço asyncio (mesmo núcleo no ESP32)
+HTTP_HEADER_TIMEOUT_MS = 2000  # Thread estática: fecha conexões que não enviam os cabeçalhos a tempo
+HTTP_THREAD_MAX_REQUESTS = 8  # Thread estática: requisições HTTP atendidas ao mesmo tempo
+STATIC_THREAD_STACK = 12 * 1024  # Pilha da thread de serviços estáticos
+HEALTH_LOG_INTERVAL_S = 60  # Intervalo do log de memória/conexões (0 desativa)
+HEALTH_LEAK_WARN = 8 * 1024  # Perda de memória livre (ocioso) que gera aviso de vazamento
+HEALTH_LAG_WARN_MS = 200  # Aumento do atraso médio do laço asyncio que gera aviso de lentidão
+HEALTH_BLOCK_PROBE = 16 * 1024  # Teto da sondagem do maior bloco livre (0 desativa)
+
+
+
+# HTML da página de limite excedido
+LIMIT_EXCEEDED_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Limite de Conexões</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body { font-family: Arial; max-width: 600px; margin: 0 auto; padding: 20px; text-align: center; }
+        .container { margin-top: 50px; }
+        h1 { color: #d32f2f; }
+        p { font-size: 18px; line-height: 1.6; }
+        .retry-btn {
+            display: inline-block;
+            margin-top: 20px;
+            padding: 10px 20px;
+            background-color: #2196f3;
+            color: white;
+            text-decoration: none;
+            border-radius: 4px;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Limite de Conexões Atingido</h1>
+        <p>O servidor ESP32 atingiu o número máximo de conexões simultâneas permitidas (%d).</p>
+        <p>Por favor, tente novamente mais tarde quando houver disponibilidade.</p>
+        <a href="/" class="retry-btn">Tentar Novamente</a>
+    </div>
+</body>
+</html>
+""" % MAX_CONNECTIONS
@@ -0,0 +1,64 @@
+import socket
+import uasyncio as asyncio
+
+import boot_timeline
+
+
+class DNSServer:
+    def __init__(self, ip, port=53):
+        self.ip = ip
+        self.port = port
+        self.socket = None
+        self.running = True
+    
+    def start(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.socket.bind(('0.0.0.0', self.port))
+        print('DNS Server iniciado')
+    
+    async def process_request(self):
+        self.handle_packet()
+    
+    def handle_packet(self):
+        # Não bloqueia: usado tanto pelo laço asyncio quanto pela thread de serviços estáticos
+        try:
+            data, addr = self.socket.recvfrom(1024)
+            if data:
+                # Extraindo ID da query DNS
+                request_id = data[0:2]
+                
+                # Construindo resposta - redirecionando para o IP do ESP
+                response = (
+                    request_id +  # Transaction ID
+                    b'\x81\x80'   # Flags (Standard response, No error)
+                    + data[4:6]   # Questions
+                    + b'\x00\x01'  # Answer RRs
+                    + b'\x00\x00'  # Authority RRs
+                    + b'\x00\x00'  # Additional RRs
+                    + data[12:]    # Original domain question
+                )
+                
+                # Adicionando answer - sempre apontando para o IP do ESP
+                response += (
+                    b'\xc0\x0c'                 # Pointer to domain name
+                    + b'\x00\x01'               # Type A (Host address)
+                    + b'\x00\x01'               # Class IN
+                    + b'\x00\x00\x00\x3c'       # TTL (60 seconds)
+                    + b'\x00\x04'               # Data length (4 bytes for IPv4)
+                    + bytes(map(int, self.ip.split('.')))  # IP address in bytes
+                )
+                
+                self.socket.sendto(response, addr)
+                boot_timeline.mark('first_dns')
+                return True
+        except Exception as e:
+            if not isinstance(e, OSError) or e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                print(f"Erro DNS: {e}")
+        return False
+
+    async def run(self):
+        self.start()
+        while self.running:
+            await self.process_request()
+            await asyncio.sleep(0.01)
@@ -0,0 +1,127 @@
+import gc
+import uasyncio as asyncio
+
+from boot_timeline import ticks_ms, ticks_diff
+from config import HEALTH_LOG_INTERVAL_S, HEALTH_LEAK_WARN, HEALTH_LAG_WARN_MS, HEALTH_BLOCK_PROBE
+
+
+def largest_free_block(limit):
+    """
+    Estima o maior bloco contíguo livre do heap por busca binária de alocações.
+
+    O MicroPython não expõe esse valor (micropython.mem_info() só imprime),
+    então tenta-se alocar bytearrays cada vez maiores, liberando-os em seguida.
+    O limite deve ser pequeno (HEALTH_BLOCK_PROBE): a sondagem ocupa
+    temporariamente até limit bytes, e no modo STATIC_THREAD a outra thread
+    pode precisar alocar nesse intervalo.
+
+    Args:
+        limit (int): Limite superior da busca
+
+    Returns:
+        int: Tamanho aproximado em bytes, com precisão de 256 bytes
+             (igual a limit quando há um bloco pelo menos desse tamanho)
+    """
+    low, high = 0, limit
+    while high - low > 256:
+        size = (low + high) // 2
+        try:
+            block = bytearray(size)
+            del block
+            low = size
+        except MemoryError:
+            high = size
+    gc.collect()
+    return low
+
+
+class HealthMonitor:
+    """
+    Registra periodicamente memória, conexões e atraso do laço asyncio.
+
+    O log permite comparar a fragmentação do heap em campo com a de testes
+    longos e ajuda a localizar vazamentos e lentidão crescente antes do
+    machine.reset() do main.py.
+    """
+    PROBE_INTERVAL_MS = 1000  # Intervalo para medir o atraso do laço
+    LAG_SMOOTHING = 4         # Peso da média móvel do atraso (1/4 para a amostra nova)
+
+    def __init__(self, websocket_server, web_server, interval_s=HEALTH_LOG_INTERVAL_S):
+        self.websocket_server = websocket_server
+        self.web_server = web_server
+        self.interval_s = interval_s
+        self.samples = 0
+        self.baseline_free = None  # Memória livre da primeira amostra sem clientes
+        self.max_lag_ms = 0
+        self.lag_avg = None        # Média móvel do atraso máximo de cada intervalo
+        self.lag_floor = None      # Menor média já vista (linha de base do atraso)
+
+    def sample(self):
+        gc.collect()
+        sample = {
+            "uptime_s": ticks_ms() // 1000,
+            "mem_free": gc.mem_free() if hasattr(gc, 'mem_free') else None,
+            "mem_alloc": gc.mem_alloc() if hasattr(gc, 'mem_alloc') else None,
+            "ws_clients": self.websocket_server.client_count,
+            "ws_pending": sum(len(p) for p in self.websocket_server.pending if p),
+            "http_active": self.web_server.active_requests,
+            "loop_lag_ms": self.max_lag_ms,
+        }
+        # Sondar só sem requisições HTTP: no modo STATIC_THREAD elas alocam em outra thread
+        if sample["mem_free"] is not None and HEALTH_BLOCK_PROBE > 0 and not sample["http_active"]:
+            sample["largest_block"] = largest_free_block(min(sample["mem_free"], HEALTH_BLOCK_PROBE))
+        else:
+            sample["largest_block"] = None
+        # Prefixos evitam colisão entre as chaves dos dois contadores
+        for key, value in self.web_server.cache.stats().items():
+            sample["cache_" + key] = value
+        for key, value in self.websocket_server.send_stats().items():
+            sample["ws_" + key] = value
+        return sample
+
+    def check(self, sample):
+        self.check_lag(sample["loop_lag_ms"])
+        # Comparar a memória livre apenas com o servidor ocioso
+        if sample["mem_free"] is None or sample["ws_clients"] or sample["http_active"]:
+            return
+        # O cache de arquivos (até ASSET_CACHE_BUDGET) e os envios pendentes são memória
+        # em uso esperado: somá-los de volta evita acusar o cache cheio como vazamento
+        free = sample["mem_free"] + sample["cache_bytes"] + sample["ws_pending"]
+        if self.baseline_free is None:
+            self.baseline_free = free
+        elif self.baseline_free - free > HEALTH_LEAK_WARN:
+            print(f"[saude] Possível vazamento: {self.baseline_free - free} bytes a menos que a linha de base")
+
+    def check_lag(self, lag_ms):
+        # Média móvel para que um pico isolado (ex.: gc.collect) não gere aviso
+        if self.lag_avg is None:
+            self.lag_avg = lag_ms
+        else:
+            self.lag_avg += (lag_ms - self.lag_avg) / self.LAG_SMOOTHING
+        if self.lag_floor is None or self.lag_avg < self.lag_floor:
+            self.lag_floor = self.lag_avg
+        elif self.lag_avg - self.lag_floor > HEALTH_LAG_WARN_MS:
+            print(f"[saude] Lentidão crescente: atraso médio do laço {self.lag_avg:.0f} ms (linha de base {self.lag_floor:.0f} ms)")
+
+    def log(self):
+        sample = self.sample()
+        self.samples += 1
+        print("[saude] " + " ".join(f"{key}={value}" for key, value in sample.items()))
+        self.check(sample)
+        self.max_lag_ms = 0
+
+    async def run(self):
+        elapsed_ms = 0
+        while True:
+            start = ticks_ms()
+            await asyncio.sleep(self.PROBE_INTERVAL_MS / 1000)
+            took = ticks_diff(ticks_ms(), start)
+            # Quanto a tarefa acordou além do previsto: laço ocupado por outras tarefas
+            self.max_lag_ms = max(self.max_lag_ms, took - self.PROBE_INTERVAL_MS)
+            elapsed_ms += took
+            if elapsed_ms >= self.interval_s * 1000:
+                elapsed_ms = 0
+                try:
+                    self.log()
+                except Exception as e:
+                    print(f"Erro no monitor de saúde: {e}")
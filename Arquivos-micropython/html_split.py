@@ -0,0 +1,159 @@
+import gc
+import os
+import ubinascii
+import uhashlib
+import uasyncio as asyncio
+
+from config import FRAGMENT_SIZE
+
+
+async def file_hash(filename):
+    """
+    Calcula o SHA-1 do arquivo lendo 512 bytes por vez.
+
+    Cede a vez ao laço asyncio a cada bloco: no boot o DNS já está rodando.
+
+    Args:
+        filename (str): Nome do arquivo
+
+    Returns:
+        str: Hash em hexadecimal
+    """
+    digest = uhashlib.sha1()
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(512)
+            if not chunk:
+                break
+            digest.update(chunk)
+            await asyncio.sleep(0)
+    return ubinascii.hexlify(digest.digest()).decode()
+
+
+async def fragments_up_to_date(filename, output_dir, fragment_size=FRAGMENT_SIZE):
+    """
+    Verifica se os fragmentos gravados em um boot anterior ainda correspondem ao arquivo.
+
+    Args:
+        filename (str): Nome do arquivo original
+        output_dir (str): Diretório dos fragmentos
+        fragment_size (int): Tamanho de cada fragmento em bytes
+
+    Returns:
+        bool: True se o index.txt (incluindo o hash do conteúdo) bate com o arquivo
+            atual e todos os fragmentos existem
+    """
+    try:
+        file_size = os.stat(filename)[6]
+        index = {}
+        with open(f'{output_dir}/index.txt', 'r') as f:
+            for line in f:
+                if ': ' in line:
+                    key, value = line.strip().split(': ', 1)
+                    index[key] = value
+
+        num_fragments = (file_size + fragment_size - 1) // fragment_size
+        if (index.get('filename') != filename
+                or index.get('filesize') != str(file_size)
+                or index.get('fragments') != str(num_fragments)):
+            return False
+
+        # Conferir o tamanho do último fragmento detecta uma divisão interrompida
+        last_size = file_size - (num_fragments - 1) * fragment_size
+        if os.stat(f'{output_dir}/fragment_{num_fragments - 1}')[6] != last_size:
+            return False
+
+        # Mesmo tamanho não garante mesmo conteúdo: comparar o hash (a verificação mais cara, por último)
+        return index.get('hash') == await file_hash(filename)
+    except (OSError, ValueError):
+        return False
+
+
+async def split_html_content(filename, output_dir, fragment_size=FRAGMENT_SIZE):
+    """
+    Lê um arquivo e divide em fragmentos menores para otimizar o uso de memória.
+    
+    Args:
+        filename (str): Nome do arquivo a ser processado
+        output_dir (str): Diretório onde os fragmentos serão salvos
+        fragment_size (int): Tamanho de cada fragmento em bytes
+    
+    Returns:
+        int: Número de fragmentos criados, ou 0 em caso de erro
+    """
+    try:
+        # Criar diretório de saída se não existir
+        try:
+            os.stat(output_dir)
+        except OSError:
+            os.mkdir(output_dir)
+        
+        # Limpar o diretório de saída
+        try:
+            files = os.listdir(output_dir)
+            for file in files:
+                os.remove(f"{output_dir}/{file}")
+                gc.collect()  # Liberar memória após cada remoção
+        except OSError:
+            pass
+        
+        # Abrir o arquivo e determinar seu tamanho
+        file_size = os.stat(filename)[6]  # Índice 6 é o tamanho do arquivo
+        
+        # Calcular o número total de fragmentos
+        num_fragments = (file_size + fragment_size - 1) // fragment_size
+        
+        print(f"Dividindo arquivo de {file_size} bytes em {num_fragments} fragmentos de {fragment_size} bytes")
+        
+        # Processar o arquivo em fragmentos
+        digest = uhashlib.sha1()
+        with open(filename, 'rb') as input_file:
+            for i in range(num_fragments):
+                # Liberar memória antes de cada fragmento
+                gc.collect()
+                await asyncio.sleep(0.1)
+                
+                # Abrir o arquivo de fragmento
+                fragment_path = f"{output_dir}/fragment_{i}"
+                with open(fragment_path, 'wb') as out_file:
+                    # Determinar quanto ler para este fragmento
+                    bytes_to_read = min(fragment_size, file_size - (i * fragment_size))
+                    
+                    # Ler e escrever em pequenos blocos
+                    chunk_size = 256  # Processar 256 bytes por vez
+                    bytes_read = 0
+                    
+                    while bytes_read < bytes_to_read:
+                        # Calcular tamanho do próximo chunk
+                        current_chunk_size = min(chunk_size, bytes_to_read - bytes_read)
+                        
+                        # Ler e escrever o chunk
+                        chunk = input_file.read(current_chunk_size)
+                        out_file.write(chunk)
+                        digest.update(chunk)
+                        
+                        # Atualizar contadores
+                        bytes_read += len(chunk)
+                        
+                        # Liberar memória e permitir outras tarefas
+                        await asyncio.sleep(0.02)
+                
+                # Mostrar progresso e liberar memória
+                if i % 5 == 0:
+                    print(f"Processado fragmento {i}/{num_fragments}")
+                    gc.collect()
+        
+        # Criando arquivo index.txt com informações dos fragmentos
+        if num_fragments > 0:
+            with open(f'{output_dir}/index.txt', 'w') as f:
+                f.write(f"fragments: {num_fragments}\n")
+                f.write(f"filename: {filename}\n")
+                f.write(f"filesize: {file_size}\n")
+                f.write(f"hash: {ubinascii.hexlify(digest.digest()).decode()}\n")
+        
+        print(f"Arquivo dividido em {num_fragments} fragmentos")
+        return num_fragments
+    
+    except Exception as e:
+        print(f"Erro ao processar arquivo {filename}: {e}")
+        return 0
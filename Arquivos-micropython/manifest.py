@@ -0,0 +1,18 @@
+# Manifesto para congelar os módulos do servidor no firmware.
+#
+# Uso (a partir de ports/esp32 do repositório do MicroPython):
+#   make BOARD=ESP32_GENERIC FROZEN_MANIFEST=/caminho/Arquivos-micropython/manifest.py
+#
+# O main.py fica de fora de propósito: ele continua no sistema de arquivos
+# e importa os módulos congelados, que rodam direto da flash sem compilação.
+
+include("$(PORT_DIR)/boards/manifest.py")
+
+module("config.py")
+module("boot_timeline.py")
+module("html_split.py")
+module("dns_server.py")
+module("web_server.py")
+module("websocket_server.py")
+module("static_services.py")
+module("health_monitor.py")
@@ -0,0 +1,59 @@
+import _thread
+import gc
+import time
+
+from config import STATIC_THREAD_STACK
+
+
+class StaticServices:
+    """
+    Executa o DNS e o HTTP estático em uma thread própria (modo STATIC_THREAD).
+
+    Assim, um download grande de fragmentos não atrasa o repasse das mensagens
+    do WebSocket, que continua sozinho no laço asyncio. O laço desta thread
+    alterna entre um pacote DNS e um passo não bloqueante de cada requisição
+    HTTP (WebServer.service_requests), então nenhuma conexão lenta segura as
+    outras. As duas threads só compartilham WebSocketServer.client_count, um
+    inteiro escrito apenas pelo laço asyncio e lido aqui sem trava.
+
+    No ESP32 as threads do MicroPython rodam no mesmo núcleo, sob o GIL: o
+    ganho é de escalonamento (o laço asyncio não serve arquivos), não de
+    paralelismo entre núcleos.
+    """
+    def __init__(self, dns_server):
+        self.dns_server = dns_server
+        self.web_server = None  # Definido por serve_http() quando os fragmentos estiverem prontos
+        self.running = True
+
+    def start(self):
+        try:
+            _thread.stack_size(STATIC_THREAD_STACK)
+        except ValueError:
+            pass  # CPython exige no mínimo 32KB: manter o padrão
+        self.dns_server.start()
+        _thread.start_new_thread(self.run, ())
+        print('Thread de serviços estáticos iniciada')
+
+    def serve_http(self, web_server):
+        web_server.start()
+        # Atribuição única da referência: a thread passa a atender HTTP no próximo ciclo
+        self.web_server = web_server
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            # Uma exceção aqui encerraria a thread em silêncio: DNS e HTTP parariam
+            # para sempre sem chegar ao machine.reset() do main.py
+            try:
+                busy = self.dns_server.handle_packet()
+                web_server = self.web_server
+                if web_server is not None and web_server.service_requests():
+                    busy = True
+            except Exception as e:
+                print(f"Erro na thread de serviços estáticos: {e}")
+                busy = False
+                gc.collect()
+            if not busy:
+                time.sleep(0.01)
@@ -0,0 +1,643 @@
+import socket
+import time
+import gc
+import os
+import uasyncio as asyncio
+from collections import OrderedDict
+
+import boot_timeline
+from boot_timeline import ticks_ms, ticks_diff
+from config import AP_IP, MAX_CONNECTIONS, LIMIT_EXCEEDED_HTML, ASSET_CACHE_BUDGET, ASSET_CACHE_LOW_HEAP, ASSET_CACHE_PINNED
+from config import HTTP_HEADER_TIMEOUT_MS, HTTP_THREAD_MAX_REQUESTS
+
+
+async def process_form_data(data, boundary):
+    """
+    Processa dados do formulário de forma eficiente em memória.
+    
+    Args:
+        data (bytes): Dados brutos do formulário
+        boundary (bytes): Boundary do formulário multipart
+    
+    Returns:
+        dict: Dicionário com os campos do formulário
+    """
+    form_data = {}
+    
+    # Verificar se temos boundary
+    if not boundary:
+        return form_data
+    
+    # Dividir em partes principais
+    parts = data.split(b'--' + boundary)
+    
+    # Processar cada parte
+    for part in parts:
+        # Liberar memória
+        gc.collect()
+        
+        # Ignorar partes vazias ou boundary final
+        if not part or part.strip() == b'--' or part.strip() == b'--\r\n':
+            continue
+        
+        # Extrair nome do campo e valor
+        if b'Content-Disposition: form-data;' in part:
+            # Extrair nome do campo
+            name_start = part.find(b'name="') + 6
+            name_end = part.find(b'"', name_start)
+            
+            if name_start > 5 and name_end > name_start:
+                field_name = part[name_start:name_end].decode()
+                
+                # Extrair conteúdo do campo
+                content_start = part.find(b'\r\n\r\n') + 4
+                if content_start > 3:
+                    content_end = len(part)
+                    if part.endswith(b'\r\n'):
+                        content_end -= 2
+                    
+                    # Para campo de conteúdo, processar em pedaços menores
+                    if field_name == 'content':
+                        field_value = part[content_start:content_end].decode()
+                    else:
+                        # Para outros campos, decodificar normalmente
+                        try:
+                            field_value = part[content_start:content_end].decode()
+                        except UnicodeDecodeError:
+                            # Manter como bytes se não for decodificável
+                            field_value = part[content_start:content_end]
+                    
+                    form_data[field_name] = field_value
+    
+    return form_data
+
+
+def mem_free():
+    # gc.mem_free() só existe no MicroPython
+    return gc.mem_free() if hasattr(gc, 'mem_free') else None
+
+
+class AssetCache:
+    """
+    Cache em RAM das respostas HTTP (cabeçalho + corpo) dos arquivos mais pedidos.
+    
+    O total é limitado a budget bytes. Os celulares pedem loader, index e
+    fragmentos sempre na mesma sequência, o pior caso de um LRU puro (cada
+    entrada nova expulsaria a próxima a ser pedida). Por isso, com o orçamento
+    cheio, entradas novas não são admitidas e o arquivo segue direto da flash;
+    só as chaves fixadas em pinned podem expulsar entradas comuns. Quando a
+    memória livre fica abaixo de low_heap, as entradas menos usadas são
+    descartadas, as fixadas por último.
+    """
+    def __init__(self, budget, low_heap, pinned=()):
+        self.budget = budget
+        self.low_heap = low_heap
+        self.pinned = pinned
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+        self.flash_reads = 0
+    
+    def admits(self, key, size):
+        """
+        Indica se uma resposta de size bytes seria guardada, antes de lê-la da flash.
+        
+        Args:
+            key (str): Caminho do arquivo
+            size (int): Tamanho da resposta em bytes
+        
+        Returns:
+            bool: True se put() guardaria a entrada
+        """
+        # Entradas maiores que metade do orçamento não compensam
+        if size > self.budget // 2:
+            return False
+        if key in self.pinned:
+            return True
+        if self.size + size > self.budget:
+            self.rejected += 1
+            return False
+        return True
+    
+    def get(self, key):
+        value = self.entries.pop(key, None)
+        if value is None:
+            self.misses += 1
+            return None
+        # Reinserir no final marca a entrada como a mais recente
+        self.entries[key] = value
+        self.hits += 1
+        self.trim()
+        return value
+    
+    def put(self, key, value):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        if key in self.pinned:
+            # Entradas fixadas abrem espaço expulsando as comuns
+            while self.size + len(value) > self.budget and self.evict_oldest():
+                pass
+        if self.size + len(value) > self.budget:
+            return
+        self.entries[key] = value
+        self.size += len(value)
+        self.trim()
+    
+    def evict_oldest(self, include_pinned=False):
+        """
+        Descarta a entrada menos usada.
+        
+        Args:
+            include_pinned (bool): Se as entradas fixadas também podem sair
+        
+        Returns:
+            bool: True se alguma entrada foi descartada
+        """
+        for key in self.entries:
+            if include_pinned or key not in self.pinned:
+                self.size -= len(self.entries.pop(key))
+                self.evictions += 1
+                return True
+        return False
+    
+    def trim(self):
+        # Liberar entradas se a memória livre estiver baixa
+        free = mem_free()
+        while free is not None and free < self.low_heap and self.entries:
+            if not self.evict_oldest() and not self.evict_oldest(True):
+                break
+            gc.collect()
+            free = mem_free()
+    
+    def clear(self):
+        self.entries = OrderedDict()
+        self.size = 0
+    
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+            "flash_reads": self.flash_reads
+        }
+
+
+# Respostas fixas montadas uma única vez
+LIMIT_EXCEEDED_RESPONSE = b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n' + LIMIT_EXCEEDED_HTML.encode()
+CAPTIVE_REDIRECT_RESPONSE = b'HTTP/1.1 302 Found\r\nLocation: http://' + AP_IP.encode() + b'\r\n\r\n'
+
+
+class HttpRequest:
+    """
+    Uma requisição HTTP atendida em passos não bloqueantes pela thread de serviços estáticos.
+    
+    Cada step() faz no máximo um recv ou um send de 512 bytes, para que o DNS
+    e as outras requisições sejam atendidos entre um passo e outro. Uma
+    conexão que não envia os cabeçalhos em HTTP_HEADER_TIMEOUT_MS (comum nas
+    pré-conexões dos celulares) é fechada.
+    """
+    SEND_TIMEOUT_MS = 15000  # Sem progresso no envio por este tempo: desistir
+    
+    def __init__(self, server, client):
+        self.server = server
+        self.client = client
+        self.client.setblocking(False)
+        self.data = b''
+        self.out = None   # memoryview do que está sendo enviado
+        self.sent = 0
+        self.file = None  # Arquivo grande demais para o cache, enviado em blocos
+        self.last_progress = ticks_ms()
+        self.done = False
+        server.active_requests += 1
+    
+    def step(self):
+        """
+        Avança a requisição sem bloquear.
+        
+        Returns:
+            bool: True se houve progresso
+        """
+        try:
+            if self.out is None:
+                return self.read()
+            return self.write()
+        except OSError as e:
+            print(f"Erro de conexão: {e}")
+        except Exception as e:
+            print(f"Erro geral: {e}")
+            print(f"Memória livre: {mem_free() or 'N/A'}")
+        self.close()
+        return True
+    
+    def read(self):
+        try:
+            chunk = self.client.recv(512)  # Receber 512 bytes por vez
+        except OSError as e:
+            if e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                raise
+            if ticks_diff(ticks_ms(), self.last_progress) > HTTP_HEADER_TIMEOUT_MS:
+                self.close()
+                return True
+            return False
+        
+        if not chunk:
+            self.close()
+            return True
+        self.data += chunk
+        boot_timeline.mark('first_http')
+        
+        if len(self.data) > 100000:  # 100KB de limite
+            error_response = "<html><body><h1>Erro</h1><p>Requisição muito grande</p></body></html>"
+            self.data = b''
+            self.out = memoryview(b'HTTP/1.1 413 Request Entity Too Large\r\nContent-Type: text/html\r\n\r\n' + error_response.encode())
+        elif b'\r\n\r\n' in self.data:
+            # Analisar requisição
+            request_line = self.data.split(b'\r\n')[0].decode()
+            method, path, _ = request_line.split(' ')
+            self.data = b''
+            
+            response, stream_path = self.server.build_response(method, path)
+            if stream_path:
+                self.file = open(stream_path, 'rb')
+                self.server.cache.flash_reads += 1
+                response = self.server.response_header(stream_path)
+            if response is None:
+                self.close()
+                return True
+            self.out = memoryview(response)
+        self.last_progress = ticks_ms()
+        return True
+    
+    def write(self):
+        try:
+            n = self.client.send(self.out[self.sent:self.sent + 512])
+        except OSError as e:
+            if e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                raise
+            if ticks_diff(ticks_ms(), self.last_progress) > self.SEND_TIMEOUT_MS:
+                self.close()
+                return True
+            return False
+        
+        self.sent += n or 0
+        self.last_progress = ticks_ms()
+        if self.sent >= len(self.out):
+            # Próximo bloco do arquivo, se a resposta vier direto da flash
+            chunk = self.file.read(512) if self.file else None
+            if chunk:
+                self.out = memoryview(chunk)
+                self.sent = 0
+            else:
+                self.close()
+        return True
+    
+    def close(self):
+        if self.done:
+            return
+        self.done = True
+        self.server.active_requests -= 1
+        if self.file:
+            self.file.close()
+            self.file = None
+        try:
+            self.client.close()
+        except:
+            pass
+        self.out = None
+        # Liberar memória ao finalizar
+        gc.collect()
+
+
+class WebServer:
+    TRIM_INTERVAL_MS = 1000  # Verificação periódica da memória livre pelo cache
+    
+    def __init__(self, port=80, websocket_server=None):
+        self.port = port
+        self.socket = None
+        self.websocket_server = websocket_server
+        self.cache = AssetCache(ASSET_CACHE_BUDGET, ASSET_CACHE_LOW_HEAP, ASSET_CACHE_PINNED)
+        self.active_requests = 0  # Conexões HTTP em atendimento
+        self.requests = []  # Requisições em andamento na thread de serviços estáticos
+        self.last_trim = ticks_ms()
+    
+    def start(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(('0.0.0.0', self.port))
+        self.socket.listen(5)
+        self.socket.setblocking(False)
+        print(f'Servidor HTTP iniciado na porta {self.port}')
+    
+    def response_header(self, file_path, length=None):
+        # Determinar o tipo de conteúdo
+        content_type = 'text/html'
+        if file_path.endswith('.css'):
+            content_type = 'text/css'
+        elif file_path.endswith('.js'):
+            content_type = 'application/javascript'
+        
+        header = f'HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n'
+        if length is not None:
+            header += f'Content-Length: {length}\r\n'
+        return (header + '\r\n').encode()
+    
+    def load_asset(self, file_path):
+        """
+        Lê um arquivo da flash e guarda a resposta HTTP completa no cache.
+        
+        Args:
+            file_path (str): Caminho do arquivo
+        
+        Returns:
+            bytes: Resposta pronta para envio, ou None se o cache não admitir o arquivo
+        """
+        size = os.stat(file_path)[6]  # Índice 6 é o tamanho do arquivo
+        header = self.response_header(file_path, size)
+        if not self.cache.admits(file_path, len(header) + size):
+            return None
+        
+        gc.collect()
+        response = bytearray(len(header) + size)
+        response[:len(header)] = header
+        view = memoryview(response)
+        with open(file_path, 'rb') as file:
+            self.cache.flash_reads += 1
+            # Ler direto no buffer em blocos de 512 bytes
+            offset = len(header)
+            while offset < len(response):
+                n = file.readinto(view[offset:offset + 512])
+                if not n:
+                    break
+                offset += n
+        
+        if offset < len(response):
+            response = response[:offset]
+        self.cache.put(file_path, response)
+        return response
+    
+    async def send_all(self, client, data):
+        """
+        Envia todos os bytes, respeitando envios parciais do socket não bloqueante.
+        
+        Args:
+            client (socket): Socket do cliente
+            data (bytes): Dados a enviar
+        """
+        view = memoryview(data)
+        sent = 0
+        start_time = time.time()
+        while sent < len(data):
+            try:
+                n = client.send(view[sent:sent + 512])
+                sent += n if n else 0
+                await asyncio.sleep(0)
+            except OSError as e:
+                if e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                    raise
+                if time.time() - start_time > 15:  # 15 segundos de timeout
+                    raise
+                await asyncio.sleep(0.01)
+    
+    def build_response(self, method, path):
+        """
+        Monta a resposta de uma requisição sem tocar no socket.
+        
+        Args:
+            method (str): Método HTTP
+            path (str): Caminho requisitado
+        
+        Returns:
+            tuple: (resposta em bytes ou None, arquivo a enviar direto da flash ou None)
+        """
+        # Verificar limite de conexões para WebSocket (contador publicado pelo WebSocketServer)
+        if self.websocket_server and self.websocket_server.client_count >= MAX_CONNECTIONS:
+            # Enviar página de limite excedido
+            return LIMIT_EXCEEDED_RESPONSE, None
+        
+        # Processar requisições GET
+        if method == 'GET':
+            file_path = None
+            
+            # Determinar o arquivo a ser servido
+            if path == '/' or path == '/index.html':
+                file_path = 'loader.html'
+            elif path.startswith('/fragments/'):
+                # Servir fragmentos HTML
+                file_name = path.split('/')[-1]
+                file_path = 'fragments/' + file_name
+            elif path == '/generate_204' or path == '/connecttest.txt' or path == '/redirect':
+                # Requisições para detecção de captive portal
+                return CAPTIVE_REDIRECT_RESPONSE, None
+            
+            if file_path:
+                try:
+                    response = self.cache.get(file_path)
+                    if response is None:
+                        response = self.load_asset(file_path)
+                    if response is None:
+                        # Arquivo grande demais para o cache: enviar direto da flash
+                        return None, file_path
+                    # Resposta pronta (cabeçalho + corpo) vinda do cache
+                    return response, None
+                except OSError as e:
+                    print(f"Erro ao ler arquivo {file_path}: {e}")
+                    error_msg = f'<html><body><h1>Erro 404</h1><p>Arquivo não encontrado: {file_path}</p></body></html>'
+                    return b'HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\n\r\n' + error_msg.encode(), None
+            
+            # Arquivo não encontrado
+            error_msg = f'<html><body><h1>Erro 404</h1><p>Página não encontrada: {path}</p></body></html>'
+            return b'HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\n\r\n' + error_msg.encode(), None
+        
+        # Processar outros métodos POST (sem upload)
+        if method == 'POST':
+            # Resposta genérica para POST quando não é upload
+            response = "<html><body><h1>Solicitação POST recebida</h1><p>Esta solicitação foi processada.</p></body></html>"
+            return b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n' + response.encode(), None
+        
+        return None, None
+    
+    async def stream_file(self, client, file_path):
+        # Ler e enviar o arquivo em chunks pequenos
+        with open(file_path, 'rb') as file:
+            self.cache.flash_reads += 1
+            await self.send_all(client, self.response_header(file_path))
+            
+            buffer_size = 512  # Reduzido para 512 bytes
+            while True:
+                chunk = file.read(buffer_size)
+                if not chunk:
+                    break
+                await self.send_all(client, chunk)
+                await asyncio.sleep(0.01)
+                gc.collect()  # Liberar memória após cada envio
+    
+    # Modificação para enviar HTML grande em partes
+    async def handle_http_request(self, client, addr):
+        """
+        Trata uma requisição HTTP.
+        
+        Args:
+            client (socket): Socket do cliente
+            addr (tuple): Endereço do cliente
+        """
+        self.active_requests += 1
+        try:
+            # Configurar socket
+            client.settimeout(5)
+            client.setblocking(False)
+            data = b''
+            
+            # Timeout para receber dados
+            start_time = time.time()
+            
+            # Parâmetros para processamento de requisições
+            headers_received = False
+            
+            while True:
+                try:
+                    # Verificar e liberar memória antes de receber dados
+                    gc.collect()
+                    
+                    chunk = client.recv(512)  # Receber 512 bytes por vez
+                    if not chunk:
+                        break
+                    
+                    data += chunk
+                    boot_timeline.mark('first_http')
+                    
+                    # Verificar se já recebemos os cabeçalhos completos
+                    if b'\r\n\r\n' in data and not headers_received:
+                        headers_received = True
+                        
+                    # Verificar se estamos recebendo muito dados
+                    if len(data) > 100000:  # 100KB de limite
+                        # Enviar resposta de erro
+                        error_response = "<html><body><h1>Erro</h1><p>Requisição muito grande</p></body></html>"
+                        client.send(b'HTTP/1.1 413 Request Entity Too Large\r\nContent-Type: text/html\r\n\r\n')
+                        client.send(error_response.encode())
+                        break
+                    
+                    # Parar se já temos os cabeçalhos
+                    if headers_received:
+                        break
+                        
+                except OSError as e:
+                    if e.args[0] == 11:  # EAGAIN/EWOULDBLOCK
+                        if time.time() - start_time > 15:  # 15 segundos de timeout
+                            break
+                        await asyncio.sleep(0.01)
+                    else:
+                        break
+                
+                # Liberar memória periodicamente
+                if len(data) % 5000 == 0:
+                    gc.collect()
+            
+            # Verificar se recebemos dados
+            if not data:
+                client.close()
+                return
+            
+            # Liberar memória antes de processar
+            gc.collect()
+            
+            # Analisar requisição
+            request_line = data.split(b'\r\n')[0].decode()
+            method, path, _ = request_line.split(' ')
+            
+            response, stream_path = self.build_response(method, path)
+            if response is not None:
+                await self.send_all(client, response)
+            if stream_path:
+                await self.stream_file(client, stream_path)
+            
+            client.close()
+        
+        except OSError as e:
+            print(f"Erro de conexão: {e}")
+        except Exception as e:
+            print(f"Erro geral: {e}")
+            print(f"Memória livre: {mem_free() or 'N/A'}")
+        finally:
+            self.active_requests -= 1
+            try:
+                client.close()
+            except:
+                pass
+            # Liberar memória ao finalizar
+            gc.collect()
+        
+    def trim_cache(self):
+        """
+        Descarta entradas do cache se a memória livre estiver baixa, no máximo uma vez por TRIM_INTERVAL_MS.
+        
+        get()/put() só verificam a memória quando chega uma requisição HTTP; a
+        pressão pode vir do WebSocket (buffers pendentes, sincronização de
+        histórico) com o HTTP parado. Chamado pelo laço que atende o HTTP (asyncio
+        ou thread de serviços estáticos), o único que mexe no cache.
+        """
+        now = ticks_ms()
+        if ticks_diff(now, self.last_trim) < self.TRIM_INTERVAL_MS:
+            return
+        self.last_trim = now
+        self.cache.trim()
+    
+    def service_requests(self):
+        """
+        Aceita conexões e avança cada requisição um passo, sem bloquear (thread de serviços estáticos).
+        
+        Returns:
+            bool: True se houve algum progresso
+        """
+        busy = False
+        self.trim_cache()
+        if len(self.requests) < HTTP_THREAD_MAX_REQUESTS:
+            client = None
+            try:
+                client, addr = self.socket.accept()
+            except OSError as e:
+                if e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                    print(f"Erro aceitando conexão: {e}")
+            if client is not None:
+                busy = True
+                request = None
+                try:
+                    request = HttpRequest(self, client)
+                    self.requests.append(request)
+                except Exception as e:
+                    # Ex.: MemoryError; não deixar o socket aberto nem o contador preso
+                    print(f"Erro ao iniciar requisição: {e}")
+                    if request is not None:
+                        request.close()
+                    else:
+                        try:
+                            client.close()
+                        except:
+                            pass
+        
+        finished = False
+        for request in self.requests:
+            busy = request.step() or busy
+            finished = finished or request.done
+        if finished:
+            self.requests = [r for r in self.requests if not r.done]
+        return busy
+    
+    async def run(self):
+        self.start()
+        while True:
+            self.trim_cache()
+            try:
+                client, addr = self.socket.accept()
+                asyncio.create_task(self.handle_http_request(client, addr))
+            except OSError as e:
+                if e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                    print(f"Erro aceitando conexão: {e}")
+                await asyncio.sleep(0.01)
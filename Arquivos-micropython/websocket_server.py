@@ -0,0 +1,506 @@
+import socket
+import json
+import ubinascii
+import uhashlib
+import uasyncio as asyncio
+
+from boot_timeline import ticks_ms, ticks_diff
+from config import MAX_CONNECTIONS, WS_FLUSH_WINDOW_MS, WS_PENDING_LIMIT
+
+
+# GUID fixo do protocolo WebSocket (RFC 6455)
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class ListaFixa:
+    def __init__(self, tamanho):
+        # Inicializa a lista com um tamanho fixo preenchido com None
+        self.tamanho = tamanho
+        self.lista = [None] * tamanho
+
+    def add(self, elemento):
+        # Adiciona o elemento no primeiro índice vazio (None)
+        for i in range(self.tamanho):
+            if self.lista[i] is None:
+                self.lista[i] = elemento
+                return i
+        return -1  # Retorna -1 se não houver espaço disponível
+
+    def remove(self, elemento):
+        # Remove a primeira ocorrência do elemento e retorna o índice
+        for i in range(self.tamanho):
+            if self.lista[i] == elemento:
+                self.lista[i] = None
+                return i
+        return -1  # Retorna -1 se o elemento não for encontrado
+
+    def getIndice(self, elemento):
+        # Retorna o índice da primeira ocorrência do elemento
+        for i in range(self.tamanho):
+            if self.lista[i] == elemento:
+                return i
+        return -1  # Retorna -1 se o elemento não for encontrado
+    def getLength(self):
+        # Retorna a quantidade de índices preenchidos (não None)
+        contador = 0
+        for elemento in self.lista:
+            if elemento is not None:
+                contador += 1
+        return contador
+    
+    def __len__(self):
+        # Permite que len(objeto) retorne o número de elementos preenchidos
+        return self.getLength()
+
+    def __str__(self):
+        # Para facilitar a visualização da lista
+        return str(self.lista)
+
+    def __iter__(self):
+        return iter(self.lista)
+
+
+class WebSocketServer:
+    def __init__(self, port=81, flush_window_ms=WS_FLUSH_WINDOW_MS):
+        self.port = port
+        self.socket = None
+        self.clients = ListaFixa(5)
+        # Número de clientes publicado para outras threads (só esta classe escreve)
+        self.client_count = 0
+        
+        # Estado de envio por posição da ListaFixa
+        self.flush_window_ms = flush_window_ms
+        self.pending = [None] * self.clients.tamanho      # Frames aguardando a janela
+        self.pending_frames = [0] * self.clients.tamanho   # Quantos frames há em pending
+        self.count_dirty = [False] * self.clients.tamanho  # userCount a enviar no próximo flush
+        self.last_send = [None] * self.clients.tamanho     # ticks_ms do último send (None: nunca)
+        self.batch_depth = 0  # > 0: entrada/saída em andamento, nada é enviado até end_batch()
+        
+        # Contadores para medir o agrupamento
+        self.frames = 0          # Frames WebSocket gerados
+        self.sends = 0           # Chamadas a send (aprox. segmentos TCP)
+        self.frames_dropped = 0  # Frames descartados (cliente saiu ou falhou antes do envio)
+        self.bytes_sent = 0
+        self.counts_collapsed = 0  # userCount descartados por um mais recente
+    
+    def start(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(('0.0.0.0', self.port))
+        self.socket.listen(5)
+        self.socket.setblocking(False)
+        print(f'Servidor WebSocket iniciado na porta {self.port}')
+    
+    def parse_headers(self, data):
+        headers = {}
+        lines = data.split(b'\r\n')
+        for line in lines:
+            if b': ' in line:
+                key, value = line.split(b': ', 1)
+                headers[key.decode().lower()] = value.decode()
+        return headers
+    
+    def generate_websocket_key(self, key):
+        key = key + WEBSOCKET_GUID
+        key_hash = uhashlib.sha1(key.encode())
+        key_hash_bytes = key_hash.digest()
+        return ubinascii.b2a_base64(key_hash_bytes).decode().strip()
+    
+    def user_count_message(self):
+        return json.dumps({
+            "type": "userCount",
+            "count": self.clients.getLength()
+        }).encode()
+    
+    def broadcast_user_count(self):
+        """Enviar para todos os clientes o número atual de usuários conectados"""
+        if self.flush_window_ms <= 0:
+            count_message = self.user_count_message()
+            for client in self.clients:
+                if client is not None:
+                    self.send_message(client, count_message)
+            return
+        
+        # O valor só é lido no flush: vários userCount seguidos viram um só
+        for i, client in enumerate(self.clients):
+            if client is None:
+                continue
+            if self.count_dirty[i]:
+                self.counts_collapsed += 1
+            self.count_dirty[i] = True
+            if self.is_idle(i):
+                self.flush_client(i)
+                
+    def desconect_user(self,client):
+        indexId = self.clients.remove(client)
+        self.client_count = self.clients.getLength()
+        if indexId >= 0:
+            self.reset_slot(indexId)
+        # userDesconect e userCount saem juntos em um único send por cliente
+        self.begin_batch()
+        try:
+            for c in self.clients:
+                if c is not None:
+                    msg = '{"type":"userDesconect","content":"' + str(indexId+1) + '"}'
+                    self.send_message(c, msg.encode())
+            # Atualizar contador de usuários quando alguém sai
+            self.broadcast_user_count()
+        finally:
+            self.end_batch()
+    
+    async def handle_websocket(self, client, addr):
+        try:
+            # Verificar limite de conexões
+            if len(self.clients) >= MAX_CONNECTIONS:
+                print("Limite de conexões WebSocket atingido. Recusando nova conexão.")
+                client.close()
+                return
+                
+            client.setblocking(False)
+            data = b''
+            
+            # Receber handshake
+            while True:
+                try:
+                    chunk = client.recv(1024)
+                    if not chunk:
+                        client.close()
+                        return
+                    data += chunk
+                    if b'\r\n\r\n' in data:
+                        break
+                except OSError as e:
+                    if e.args[0] == 11:  # EAGAIN/EWOULDBLOCK
+                        await asyncio.sleep(0.01)
+                    else:
+                        client.close()
+                        return
+            
+            # Processar handshake
+            headers = self.parse_headers(data)
+            
+            if 'sec-websocket-key' not in headers:
+                client.close()
+                return
+            
+            # Responder com handshake WebSocket
+            key = headers['sec-websocket-key']
+            accept_key = self.generate_websocket_key(key)
+            
+            response = (
+                b'HTTP/1.1 101 Switching Protocols\r\n'
+                b'Upgrade: websocket\r\n'
+                b'Connection: Upgrade\r\n'
+                b'Sec-WebSocket-Accept: ' + accept_key.encode() + b'\r\n\r\n'
+            )
+            
+            client.send(response)
+            
+            # Adicionar cliente à lista
+            indice = self.clients.add(client)
+            if indice < 0:
+                # Outro handshake ocupou a última vaga enquanto este era lido
+                print("Limite de conexões WebSocket atingido. Recusando nova conexão.")
+                client.close()
+                return
+            self.client_count = self.clients.getLength()
+            # O handshake acabou de sair: userCount e idClient seguem juntos no próximo flush
+            self.reset_slot(indice)
+            self.last_send[indice] = ticks_ms()
+            
+            # Sem flush agora: os outros clientes recebem o userCount ao fim da janela,
+            # junto com o identify/syncRequest que o novo cliente envia logo em seguida
+            self.begin_batch()
+            try:
+                # Atualizar contador de usuários para todos
+                self.broadcast_user_count()
+                
+                idClient = '{"type":"idClient","content":"' + str(indice+1) + '"}'
+                print("Cliente "+str(indice+1) )
+                #welcome_msg = '{"type":"idClient","sender":"Sistema","content":"Bem-vindo ao chat!"}'
+               
+                self.send_message(client, idClient.encode())
+            finally:
+                self.end_batch(flush=False)
+            
+            # Processar mensagens
+            buffer = b''
+            while True:
+                try:
+                    data = client.recv(1024)
+                    if not data:
+                        break
+                    
+                    buffer += data
+                    message = self.decode_websocket_frame(buffer)
+                    
+                    if message:
+                        buffer = b''
+                        # Broadcast para todos os clientes
+                        for c in self.clients:
+                            if c is not None:
+                                if c != client:  # Não reenvie para o próprio remetente
+                                    self.send_message(c, message)
+                
+                except OSError as e:
+                    if e.args[0] == 11:  # EAGAIN/EWOULDBLOCK
+                        await asyncio.sleep(0.01)
+                    else:
+                        break
+        
+        except Exception as e:
+            print(f"Erro WebSocket: {e}")
+        
+        finally:
+            if client in self.clients:
+                self.desconect_user(client)
+                
+            try:
+                client.close()
+            except:
+                pass
+    
+    def decode_websocket_frame(self, data):
+        if len(data) < 6:
+            return None
+        
+        # Primeiros 2 bytes contêm informações de controle
+        b1, b2 = data[0], data[1]
+        
+        # Verificar FIN e opcode
+        fin = b1 & 0x80
+        opcode = b1 & 0x0F
+        
+        if opcode == 8:  # Close frame
+            return None
+        
+        # Verificar se é mascarado (deve ser para mensagens do cliente)
+        mask = b2 & 0x80
+        if not mask:
+            return None
+        
+        # Tamanho da payload
+        payload_len = b2 & 0x7F
+        
+        # Determinar onde começa a máscara e os dados
+        mask_offset = 2
+        if payload_len == 126:
+            mask_offset = 4
+        elif payload_len == 127:
+            mask_offset = 10
+        
+        # Verificar se temos dados suficientes
+        if len(data) < mask_offset + 4:
+            return None
+        
+        # Obter a máscara
+        mask_key = data[mask_offset:mask_offset+4]
+        
+        # Calcular onde começa a payload
+        data_offset = mask_offset + 4
+        
+        # Verificar se temos toda a payload
+        if payload_len == 126:
+            payload_len = (data[2] << 8) | data[3]
+        elif payload_len == 127:
+            payload_len = 0
+            for i in range(8):
+                payload_len = (payload_len << 8) | data[2+i]
+        
+        if len(data) < data_offset + payload_len:
+            return None
+        
+        # Desmascarar a payload
+        payload = bytearray(payload_len)
+        for i in range(payload_len):
+            payload[i] = data[data_offset + i] ^ mask_key[i % 4]
+        
+        return payload
+    
+    def reset_slot(self, index):
+        # O que ainda estava pendente nunca vai sair: contar como descartado
+        self.frames_dropped += self.pending_frames[index]
+        self.pending_frames[index] = 0
+        self.pending[index] = None
+        self.count_dirty[index] = False
+        self.last_send[index] = None
+    
+    def window_elapsed(self, index):
+        last_send = self.last_send[index]
+        return last_send is None or ticks_diff(ticks_ms(), last_send) >= self.flush_window_ms
+    
+    def is_idle(self, index):
+        # Nada pendente, nenhum send recente e fora de um lote: enviar na hora em vez de esperar a janela
+        return not self.batch_depth and not self.pending[index] and self.window_elapsed(index)
+    
+    def begin_batch(self):
+        """Segura os envios: os frames gerados até end_batch() ficam pendentes."""
+        self.batch_depth += 1
+    
+    def end_batch(self, flush=True):
+        """
+        Fecha um lote aberto por begin_batch().
+        
+        Args:
+            flush (bool): Enviar já, em um send por cliente, o que estiver pendente
+                          para clientes fora da janela (os demais esperam o flush_loop)
+        """
+        self.batch_depth -= 1
+        if self.batch_depth or not flush:
+            return
+        for i in range(self.clients.tamanho):
+            if (self.pending[i] or self.count_dirty[i]) and self.window_elapsed(i):
+                self.flush_client(i)
+    
+    def send_message(self, client, message):
+        direct = False
+        try:
+            frame = self.encode_frame(message)
+            self.frames += 1
+            
+            index = self.clients.getIndice(client) if self.flush_window_ms > 0 else -1
+            if index < 0:
+                # Agrupamento desativado (ou cliente fora da lista): enviar direto
+                direct = True
+                client.send(frame)
+                self.sends += 1
+                self.bytes_sent += len(frame)
+                return
+            
+            idle = self.is_idle(index)
+            if self.pending[index]:
+                self.pending[index] += frame
+            else:
+                self.pending[index] = bytearray(frame)
+            self.pending_frames[index] += 1
+            
+            if idle:
+                self.flush_client(index)
+            
+        except Exception as e:
+            print(f"Erro ao enviar mensagem: {e}")
+            if direct:
+                self.frames_dropped += 1
+            if client in self.clients:
+                self.desconect_user(client)
+                try:
+                    client.close()
+                except:
+                    pass
+    
+    def flush_client(self, index):
+        """
+        Envia de uma vez os frames pendentes de um cliente (e o userCount mais recente).
+        
+        Args:
+            index (int): Posição do cliente na ListaFixa
+        """
+        client = self.clients.lista[index]
+        if client is None:
+            return
+        
+        buffer = self.pending[index]
+        if self.count_dirty[index]:
+            frame = self.encode_frame(self.user_count_message())
+            self.frames += 1
+            buffer = buffer + frame if buffer else bytearray(frame)
+            self.pending_frames[index] += 1
+            self.count_dirty[index] = False
+        if not buffer:
+            return
+        
+        try:
+            sent = client.send(buffer)
+            self.sends += 1
+            self.last_send[index] = ticks_ms()
+        except OSError as e:
+            if e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                print(f"Erro ao enviar mensagem: {e}")
+                self.desconect_user(client)
+                try:
+                    client.close()
+                except:
+                    pass
+                return
+            sent = 0
+        
+        sent = sent or 0
+        self.bytes_sent += sent
+        # Envio parcial: manter o restante para o próximo flush
+        # (frames cortados no meio continuam contando como pendentes)
+        if sent < len(buffer):
+            self.pending[index] = buffer[sent:]
+        else:
+            self.pending[index] = None
+            self.pending_frames[index] = 0
+        if self.pending[index] and len(self.pending[index]) > WS_PENDING_LIMIT:
+            print("Cliente WebSocket lento demais, desconectando")
+            self.desconect_user(client)
+            try:
+                client.close()
+            except:
+                pass
+    
+    def flush_all(self):
+        for i in range(self.clients.tamanho):
+            if self.pending[i] or self.count_dirty[i]:
+                self.flush_client(i)
+    
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_window_ms / 1000)
+            try:
+                self.flush_all()
+            except Exception as e:
+                print(f"Erro no flush WebSocket: {e}")
+    
+    def send_stats(self):
+        # Só frames entregues contam como agrupados; descartados e pendentes ficam à parte
+        pending = sum(self.pending_frames)
+        delivered = self.frames - self.frames_dropped - pending
+        return {
+            "frames": self.frames,
+            "sends": self.sends,
+            "frames_dropped": self.frames_dropped,
+            "frames_pending": pending,
+            "sends_saved": max(0, delivered - self.sends),
+            "bytes": self.bytes_sent,
+            "counts_collapsed": self.counts_collapsed
+        }
+    
+    def encode_frame(self, message):
+        # Criar cabeçalho para frame WebSocket
+        header = bytearray()
+        
+        # FIN bit + opcode text
+        header.append(0x81)  
+        
+        msg_len = len(message)
+        
+        # Tamanho da payload
+        if msg_len < 126:
+            header.append(msg_len)
+        elif msg_len < 65536:
+            header.append(126)
+            header.append((msg_len >> 8) & 0xFF)
+            header.append(msg_len & 0xFF)
+        else:
+            header.append(127)
+            for i in range(7, -1, -1):
+                header.append((msg_len >> (i * 8)) & 0xFF)
+        
+        return header + message
+    
+    async def run(self):
+        self.start()
+        if self.flush_window_ms > 0:
+            asyncio.create_task(self.flush_loop())
+        while True:
+            try:
+                client, addr = self.socket.accept()
+                # Verificação de limite movida para dentro do handler
+                asyncio.create_task(self.handle_websocket(client, addr))
+            except OSError as e:
+                if e.args[0] != 11:  # EAGAIN/EWOULDBLOCK
+                    print(f"Erro aceitando conexão: {e}")
+                await asyncio.sleep(0.01)
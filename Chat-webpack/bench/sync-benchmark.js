@@ -0,0 +1,146 @@
+// Benchmark headless do ChatController: sincronização de um histórico grande.
+//
+// Uso: node bench/sync-benchmark.js [arquivo.js] [quantidade]
+//   arquivo.js  versão do ChatController a medir (padrão: src/index.js)
+//   quantidade  mensagens no syncResponse (padrão: 5000)
+//
+// Roda sem navegador: um DOM mínimo simula apenas o que o ChatController usa,
+// com altura fixa por mensagem para a rolagem.
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const MESSAGE_HEIGHT = 50;
+
+class FakeElement {
+    constructor(tag) {
+        this.tagName = tag;
+        this.children = [];
+        this.parent = null;
+        this.dataset = {};
+        this.style = {};
+        this.classList = { add() {} };
+        this.listeners = {};
+        this.clientHeight = 500;
+        this._scrollTop = 0;
+        this._text = '';
+    }
+
+    get childElementCount() { return this.children.length; }
+    get firstElementChild() { return this.children[0] || null; }
+    get lastElementChild() { return this.children[this.children.length - 1] || null; }
+    get firstChild() { return this.firstElementChild; }
+    get scrollHeight() { return Math.max(this.children.length * MESSAGE_HEIGHT, this.clientHeight); }
+    get scrollTop() { return this._scrollTop; }
+    set scrollTop(value) {
+        this._scrollTop = Math.max(0, Math.min(value, this.scrollHeight - this.clientHeight));
+    }
+    set textContent(value) { this._text = value; this.children.forEach(c => { c.parent = null; }); this.children = []; }
+    get textContent() { return this._text; }
+    set innerHTML(value) { this.textContent = value; }
+
+    // Fragmentos transferem os filhos, como no DOM real
+    take(node) {
+        const nodes = node.isFragment ? node.children.splice(0) : [node];
+        nodes.forEach(n => { n.parent = this; });
+        return nodes;
+    }
+    appendChild(node) { this.children.push(...this.take(node)); return node; }
+    insertBefore(node, ref) {
+        const at = ref ? this.children.indexOf(ref) : this.children.length;
+        this.children.splice(at, 0, ...this.take(node));
+        return node;
+    }
+    removeChild(node) {
+        this.children.splice(this.children.indexOf(node), 1);
+        node.parent = null;
+        return node;
+    }
+    querySelectorAll(selector) {
+        if (selector !== '[data-index]') throw new Error(`Seletor não suportado: ${selector}`);
+        return this.children.filter(c => c.dataset.index !== undefined);
+    }
+    querySelector(selector) { return this.querySelectorAll(selector)[0] || null; }
+    addEventListener(type, fn) { (this.listeners[type] = this.listeners[type] || []).push(fn); }
+    dispatch(type) { (this.listeners[type] || []).forEach(fn => fn({ preventDefault() {} })); }
+}
+
+function loadController(file) {
+    const elements = {};
+    const frames = [];
+    const sent = [];
+    const document = {
+        createElement: tag => new FakeElement(tag),
+        createDocumentFragment: () => Object.assign(new FakeElement('#fragment'), { isFragment: true }),
+        getElementById: id => (elements[id] = elements[id] || new FakeElement('div')),
+        querySelector: sel => (elements[sel] = elements[sel] || new FakeElement('div'))
+    };
+    class WebSocket {
+        static OPEN = 1;
+        constructor() { this.readyState = WebSocket.OPEN; }
+        send(data) { sent.push(data); }
+    }
+    const context = vm.createContext({
+        document, WebSocket, console: { log() {}, error: console.error },
+        requestAnimationFrame: fn => frames.push(fn),
+        setTimeout: () => 0, clearTimeout() {}, setInterval: () => 0, clearInterval() {},
+        require: () => ({})
+    });
+    const source = fs.readFileSync(file, 'utf8')
+        .replace(/new ChatController\(\)\s*$/, 'globalThis.controller = new ChatController()');
+    vm.runInContext(source, context);
+
+    const runFrames = () => { while (frames.length) frames.shift()(); };
+    return { controller: context.controller, container: elements['msger-chat'], runFrames };
+}
+
+function main() {
+    const file = path.resolve(process.argv[2] || path.join(__dirname, '..', 'src', 'index.js'));
+    const count = Number(process.argv[3] || 5000);
+    const { controller, container, runFrames } = loadController(file);
+
+    controller.handleWebSocketMessage({ data: JSON.stringify({ type: 'idClient', content: '1' }) });
+    runFrames();
+
+    const history = [];
+    for (let i = 0; i < count; i++) {
+        history.push({ id: Math.floor(i / 4) + 1, userId: 2 + (i % 4), content: `mensagem ${i}`, timestamp: '01/01/2025 12:00' });
+    }
+    const sync = { data: JSON.stringify({ type: 'syncResponse', targetClientId: 1, history }) };
+
+    let start = process.hrtime.bigint();
+    controller.handleWebSocketMessage(sync);
+    runFrames();
+    const syncMs = Number(process.hrtime.bigint() - start) / 1e6;
+    let maxNodes = container.childElementCount;
+
+    // Segunda sincronização com o mesmo histórico: tudo deve ser descartado como duplicata
+    start = process.hrtime.bigint();
+    controller.handleWebSocketMessage(sync);
+    runFrames();
+    const dedupMs = Number(process.hrtime.bigint() - start) / 1e6;
+
+    // Rolar até o topo do histórico e voltar, página por página
+    let pages = 0;
+    while (controller.firstRenderedIndex > 0 && pages < count) {
+        container.scrollTop = 0;
+        container.dispatch('scroll');
+        maxNodes = Math.max(maxNodes, container.childElementCount);
+        pages++;
+    }
+    let pagesDown = 0;
+    for (let i = 0; i < count && controller.detached; i++) {
+        container.scrollTop = container.scrollHeight;
+        container.dispatch('scroll');
+        maxNodes = Math.max(maxNodes, container.childElementCount);
+        pagesDown++;
+    }
+
+    console.log(`${path.relative(process.cwd(), file)}: ${count} mensagens`);
+    console.log(`  sincronização:        ${syncMs.toFixed(1)} ms`);
+    console.log(`  resincronização:      ${dedupMs.toFixed(1)} ms (histórico: ${controller.messageHistory.length})`);
+    console.log(`  páginas rolando:      ${pages} para cima, ${pagesDown} para baixo`);
+    console.log(`  máximo de nós no DOM: ${maxNodes}`);
+}
+
+main();
@@ -9,6 +9,12 @@ class ChatController {
         INDICATOR_MIN: 12   // Altura mínima do indicador em %
     };
 
+    // Configurações de renderização das mensagens
+    static RENDER_CONFIG = {
+        MAX_NODES: 200,     // Máximo de mensagens mantidas no DOM
+        PAGE_SIZE: 50       // Mensagens antigas recarregadas ao chegar no topo
+    };
+
       // Elementos DOM organizados
     static DOM_ELEMENTS = {
         chatContainer: 'msger-chat',
@@ -38,6 +44,12 @@ class ChatController {
         this.webSocket = null;
         this.currentUser = null;
         this.messageHistory = [];
+        this.messageIndex = new Set();    // Chaves `${userId}:${id}` do histórico
+        this.pendingMessages = [];        // Mensagens aguardando o próximo frame
+        this.renderScheduled = false;
+        this.firstRenderedIndex = 0;      // Primeiro índice do histórico presente no DOM
+        this.lastRenderedIndex = -1;      // Último índice do histórico presente no DOM
+        this.detached = false;            // true: o fim do histórico não está no DOM
         this.lastMessageId = 0;
         this.scrollState = {
             isActive: false,
@@ -78,7 +90,14 @@ class ChatController {
         const { chatContainer, scrollUpButton, scrollDownButton } = this.elements;
 
         this.updateScrollIndicator();
-        chatContainer.addEventListener('scroll', () => this.updateScrollIndicator());
+        chatContainer.addEventListener('scroll', () => {
+            this.updateScrollIndicator();
+            if (chatContainer.scrollTop === 0) {
+                this.loadOlderMessages();
+            } else if (chatContainer.scrollTop + chatContainer.clientHeight >= chatContainer.scrollHeight - 1) {
+                this.loadNewerMessages();
+            }
+        });
 
         const scrollEvents = [
             { element: scrollUpButton, direction: -1 },
@@ -246,19 +265,16 @@ class ChatController {
             }
 
             data.history.forEach(msg => {
-                const exists = this.messageHistory.some(m =>
-                    m.id === msg.id && m.userId === msg.usuarioId
-                );
-                if (!exists) {
+                if (!this.hasMessage(msg.userId, msg.id)) {
                     const type = msg.userId === this.currentUser.id ? "right-msg" : "left-msg";
-                    this.addMessage(msg.content, type, msg.userId, msg.timestamp);
                     if (msg.id > this.lastMessageId) this.lastMessageId = msg.id;
-                    this.messageHistory.push({
+                    const index = this.recordMessage({
                         id: msg.id,
                         timestamp: msg.timestamp,
                         userId: msg.userId,
                         content: msg.content
                     });
+                    this.addMessage(msg.content, type, msg.userId, msg.timestamp, index);
                 }
             });
 
@@ -273,22 +289,34 @@ class ChatController {
 
     // Manipula nova mensagem
     handleNewMessage(data) {
-        const exists = this.messageHistory.some(m =>
-            m.id === data.id && m.userId === data.senderId
-        );
-
-        if (!exists) {          
+        if (!this.hasMessage(data.senderId, data.id)) {
             const messageType = data.senderId === this.currentUser.id ? "right-msg" : "left-msg";
-            this.addMessage(data.content, messageType, data.senderId, data.timestamp);
-            this.messageHistory.push({
+            const index = this.recordMessage({
                 id: data.id || ++this.lastMessageId,
                 timestamp: data.timestamp || this.getFormattedTime(),
                 userId: data.senderId,
                 content: data.content
             });
+            this.addMessage(data.content, messageType, data.senderId, data.timestamp, index);
         }
     }
 
+    // Chave única de uma mensagem no índice do histórico
+    messageKey(userId, id) {
+        return `${userId}:${id}`;
+    }
+
+    // Verifica em O(1) se a mensagem já está no histórico
+    hasMessage(userId, id) {
+        return this.messageIndex.has(this.messageKey(userId, id));
+    }
+
+    // Adiciona a mensagem ao histórico e ao índice, retornando sua posição
+    recordMessage(message) {
+        this.messageIndex.add(this.messageKey(message.userId, message.id));
+        return this.messageHistory.push(message) - 1;
+    }
+
     // Manipula identificação do cliente
     handleClientIdentification(data) {
         this.currentUser = this.getUserById(parseInt(data.content));
@@ -306,8 +334,111 @@ class ChatController {
         setTimeout(() => this.requestHistorySync(), 1000);
     }
 
-    // Adiciona mensagem ao chat
-    addMessage(content, type, userId, timestamp) {
+    // Adiciona mensagem ao chat (renderizada em lote no próximo frame)
+    addMessage(content, type, userId, timestamp, index) {
+        this.pendingMessages.push({ content, type, userId, timestamp, index });
+
+        if (!this.renderScheduled) {
+            this.renderScheduled = true;
+            requestAnimationFrame(() => this.flushPendingMessages());
+        }
+    }
+
+    // Insere as mensagens pendentes de uma só vez usando DocumentFragment
+    flushPendingMessages() {
+        const { chatContainer } = this.elements;
+        const { MAX_NODES } = ChatController.RENDER_CONFIG;
+        let pending = this.pendingMessages;
+        this.pendingMessages = [];
+        this.renderScheduled = false;
+
+        if (this.detached) {
+            // O usuário estava lendo mensagens antigas: voltar ao fim do histórico
+            this.detached = false;
+            chatContainer.textContent = '';
+            const tailStart = Math.max(0, this.messageHistory.length - MAX_NODES);
+            pending = this.historyItems(tailStart, this.messageHistory.length)
+                .concat(pending.filter(msg => msg.index === undefined));
+        }
+
+        // Mensagens além do limite seriam removidas logo em seguida: nem criá-las
+        if (pending.length >= MAX_NODES) {
+            pending = pending.slice(-MAX_NODES);
+            chatContainer.textContent = '';
+        }
+
+        chatContainer.appendChild(this.buildFragment(pending));
+        this.trimRenderedMessages(true);
+        this.scrollToBottom();
+    }
+
+    // Dados de renderização das mensagens [start, end) do histórico
+    historyItems(start, end) {
+        const items = [];
+        for (let i = start; i < end; i++) {
+            const msg = this.messageHistory[i];
+            const type = this.currentUser && msg.userId === this.currentUser.id ? "right-msg" : "left-msg";
+            items.push({ content: msg.content, type, userId: msg.userId, timestamp: msg.timestamp, index: i });
+        }
+        return items;
+    }
+
+    // Monta um DocumentFragment com os elementos das mensagens
+    buildFragment(items) {
+        const fragment = document.createDocumentFragment();
+        items.forEach(msg => {
+            fragment.appendChild(this.createMessageElement(msg.content, msg.type, msg.userId, msg.timestamp, msg.index));
+        });
+        return fragment;
+    }
+
+    // Mantém no máximo MAX_NODES mensagens no DOM (as removidas continuam no histórico)
+    trimRenderedMessages(fromTop) {
+        const { chatContainer } = this.elements;
+        while (chatContainer.childElementCount > ChatController.RENDER_CONFIG.MAX_NODES) {
+            const node = fromTop ? chatContainer.firstElementChild : chatContainer.lastElementChild;
+            if (!fromTop && node.dataset.index !== undefined) this.detached = true;
+            chatContainer.removeChild(node);
+        }
+
+        const rendered = chatContainer.querySelectorAll('[data-index]');
+        this.firstRenderedIndex = rendered.length ? Number(rendered[0].dataset.index) : this.messageHistory.length;
+        this.lastRenderedIndex = rendered.length ? Number(rendered[rendered.length - 1].dataset.index) : -1;
+    }
+
+    // Recarrega uma página de mensagens antigas ao chegar no topo, removendo as de baixo
+    loadOlderMessages() {
+        const { chatContainer } = this.elements;
+        if (this.firstRenderedIndex <= 0) return;
+
+        const start = Math.max(0, this.firstRenderedIndex - ChatController.RENDER_CONFIG.PAGE_SIZE);
+        const fragment = this.buildFragment(this.historyItems(start, this.firstRenderedIndex));
+
+        // Manter a mensagem visível no mesmo lugar após inserir acima dela
+        const previousHeight = chatContainer.scrollHeight;
+        chatContainer.insertBefore(fragment, chatContainer.firstChild);
+        chatContainer.scrollTop += chatContainer.scrollHeight - previousHeight;
+        this.trimRenderedMessages(false);
+    }
+
+    // Recarrega a página seguinte ao chegar no fim enquanto o fim do histórico está fora do DOM
+    loadNewerMessages() {
+        const { chatContainer } = this.elements;
+        if (!this.detached) return;
+
+        const start = this.lastRenderedIndex + 1;
+        const end = Math.min(this.messageHistory.length, start + ChatController.RENDER_CONFIG.PAGE_SIZE);
+        chatContainer.appendChild(this.buildFragment(this.historyItems(start, end)));
+
+        // Remover as de cima sem deslocar a mensagem visível
+        const previousHeight = chatContainer.scrollHeight;
+        this.trimRenderedMessages(true);
+        chatContainer.scrollTop -= previousHeight - chatContainer.scrollHeight;
+        if (end >= this.messageHistory.length) this.detached = false;
+    }
+
+    // Cria o elemento DOM de uma mensagem
+    createMessageElement(content, type, userId, timestamp, index) {
         const messageElement = document.createElement('div');
         messageElement.className = `msg ${type === 'system' ? 'center-msg' : type}`;
 
@@ -352,8 +483,10 @@ class ChatController {
         bubbleElement.appendChild(textElement);
         messageElement.appendChild(bubbleElement);
 
-        this.elements.chatContainer.appendChild(messageElement);
-        this.scrollToBottom();
+        if (index !== undefined) {
+            messageElement.dataset.index = index;
+        }
+        return messageElement;
     }
 
     // Adiciona mensagem do sistema
@@ -378,13 +511,13 @@ class ChatController {
             timestamp
         }));
 
-        this.addMessage(content, "right-msg", this.currentUser.id, timestamp);
-        this.messageHistory.push({
+        const index = this.recordMessage({
             id: messageId,
             timestamp,
             userId: this.currentUser.id,
             content
         });
+        this.addMessage(content, "right-msg", this.currentUser.id, timestamp, index);
 
         this.elements.chatInput.value = '';
     }
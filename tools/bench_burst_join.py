@@ -0,0 +1,71 @@
+"""
+Benchmark de entrada em massa no WebServer (cache de arquivos ligado x desligado).
+
+Cada "celular" pede o que o loader.html pede: /, fragments/index.txt e todos
+os fragmentos, em sequência. Os celulares entram em ondas de --burst ao mesmo
+tempo. Mede leituras da flash, acertos do cache e o tempo até o último byte.
+
+Uso:
+    python tools/bench_burst_join.py --phones 10 --burst 5
+"""
+import argparse
+import asyncio
+import time
+
+import host
+
+from config import ASSET_CACHE_BUDGET
+from web_server import WebServer
+
+
+async def join(port, paths, delay):
+    start = time.perf_counter()
+    for path in paths:
+        response = await host.http_get(port, path)
+        if not response.startswith(b'HTTP/1.1 200'):
+            raise RuntimeError(f'{path}: {response[:40]}')
+        await asyncio.sleep(delay)
+    return time.perf_counter() - start
+
+
+async def run(budget, phones, burst, delay, port):
+    web = WebServer(port)
+    web.cache.budget = budget
+    server = asyncio.create_task(web.run())
+    await asyncio.sleep(0.05)
+
+    paths = host.fragment_paths()
+    times = []
+    for first in range(0, phones, burst):
+        wave = range(first, min(first + burst, phones))
+        times += await asyncio.gather(*[join(port, paths, delay) for _ in wave])
+
+    server.cancel()
+    web.socket.close()
+    times.sort()
+    return web.cache.stats(), times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--phones', type=int, default=10)
+    parser.add_argument('--burst', type=int, default=5, help='celulares entrando ao mesmo tempo')
+    parser.add_argument('--delay', type=float, default=0, help='pausa entre pedidos (loader usa 0.3 s)')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--budget', type=int, action='append',
+                        help='orçamento do cache em KB (pode repetir; 0 = sem cache)')
+    args = parser.parse_args()
+
+    host.prepare_workdir()
+    print(f'{args.phones} celulares, ondas de {args.burst}, {len(host.fragment_paths())} pedidos por celular')
+    for budget_kb in args.budget or (0, ASSET_CACHE_BUDGET // 1024):
+        label = f'cache {budget_kb} KB' if budget_kb else 'sem cache'
+        stats, times = asyncio.run(run(budget_kb * 1024, args.phones, args.burst, args.delay, args.port))
+        p50 = times[len(times) // 2] * 1000
+        print(f'{label:>12}: flash_reads={stats["flash_reads"]:3d} hits={stats["hits"]:3d} '
+              f'misses={stats["misses"]:3d} evictions={stats["evictions"]} '
+              f'último byte p50={p50:.0f} ms máx={times[-1] * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Suporte para rodar os módulos de Arquivos-micropython no CPython.
+
+Registra os módulos uasyncio, ubinascii e uhashlib como apelidos dos
+equivalentes do CPython e coloca a pasta do ESP32 no sys.path. Deve ser
+importado antes de qualquer módulo do servidor.
+"""
+import asyncio
+import binascii
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEVICE_DIR = os.path.join(REPO_DIR, 'Arquivos-micropython')
+
+sys.modules.setdefault('uasyncio', asyncio)
+sys.modules.setdefault('ubinascii', binascii)
+sys.modules.setdefault('uhashlib', hashlib)
+if DEVICE_DIR not in sys.path:
+    sys.path.insert(0, DEVICE_DIR)
+
+
+def prepare_workdir():
+    """
+    Cria um diretório temporário com loader.html, chat.html e os fragmentos,
+    como o sistema de arquivos do ESP32 fica após o boot, e entra nele.
+
+    Returns:
+        str: Caminho do diretório
+    """
+    from html_split import split_html_content
+    from config import FRAGMENT_SIZE
+
+    workdir = tempfile.mkdtemp(prefix='esp32-chat-')
+    for name in ('loader.html', 'chat.html'):
+        shutil.copy(os.path.join(DEVICE_DIR, name), workdir)
+    os.chdir(workdir)
+
+    # A divisão dorme entre blocos para não travar o ESP32; no computador não precisa
+    sleep = asyncio.sleep
+
+    async def no_sleep(delay, result=None):
+        return result
+
+    asyncio.sleep = no_sleep
+    try:
+        asyncio.run(split_html_content('chat.html', 'fragments', FRAGMENT_SIZE))
+    finally:
+        asyncio.sleep = sleep
+    return workdir
+
+
+async def http_get(port, path):
+    """
+    Faz um GET e lê a resposta até o servidor fechar a conexão.
+
+    Returns:
+        bytes: Resposta completa (cabeçalho + corpo)
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: 192.168.4.1\r\n\r\n'.encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+def fragment_paths():
+    """Caminhos que o loader.html pede, na ordem: loader, index e fragmentos."""
+    with open('fragments/index.txt') as f:
+        count = int(f.readline().split(':')[1])
+    return ['/', '/fragments/index.txt'] + [f'/fragments/fragment_{i}' for i in range(count)]
+
+
+async def ws_connect(port):
+    """
+    Abre uma conexão WebSocket como o chat.html faz.
+
+    Returns:
+        tuple: (reader, writer) do asyncio, já depois do handshake
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    key = binascii.b2a_base64(os.urandom(16)).decode().strip()
+    writer.write((f'GET / HTTP/1.1\r\nHost: 192.168.4.1\r\nUpgrade: websocket\r\n'
+                  f'Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n'
+                  f'Sec-WebSocket-Version: 13\r\n\r\n').encode())
+    await writer.drain()
+    response = await reader.readuntil(b'\r\n\r\n')
+    if not response.startswith(b'HTTP/1.1 101'):
+        raise RuntimeError(f'handshake recusado: {response[:40]}')
+    return reader, writer
+
+
+async def ws_send(writer, message):
+    """Envia um frame de texto mascarado (clientes sempre mascaram)."""
+    payload = message.encode() if isinstance(message, str) else message
+    mask = os.urandom(4)
+    header = bytearray([0x81])
+    if len(payload) < 126:
+        header.append(0x80 | len(payload))
+    else:
+        header.append(0x80 | 126)
+        header += len(payload).to_bytes(2, 'big')
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    writer.write(bytes(header) + mask + masked)
+    await writer.drain()
+
+
+async def ws_recv(reader):
+    """
+    Lê um frame do servidor (sem máscara).
+
+    Returns:
+        bytes: Payload do frame
+    """
+    b1, b2 = await reader.readexactly(2)
+    length = b2 & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), 'big')
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), 'big')
+    return await reader.readexactly(length)
+
+
+def dns_query(port, name=b'\x07example\x03com\x00', timeout=2.0):
+    """
+    Envia uma consulta DNS tipo A e espera a resposta (bloqueante).
+
+    Returns:
+        float: Tempo de resposta em segundos, ou None se não houve resposta
+    """
+    import socket
+    import time
+
+    query = os.urandom(2) + b'\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00' + name + b'\x00\x01\x00\x01'
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        start = time.perf_counter()
+        sock.sendto(query, ('127.0.0.1', port))
+        sock.recvfrom(512)
+        return time.perf_counter() - start
+    except OSError:
+        return None
+    finally:
+        sock.close()
@@ -0,0 +1,178 @@
+"""
+Compara a latência do chat e do DNS com STATIC_THREAD desligado e ligado.
+
+O servidor roda em um processo filho (DNS, HTTP e WebSocket no loopback, como
+o main.py monta cada modo). O processo principal mede:
+ - o repasse de mensagens entre dois clientes WebSocket;
+ - o tempo de resposta do DNS;
+primeiro sem carga e depois com celulares baixando todos os fragmentos e
+pré-conexões ociosas (conexões TCP que nunca enviam cabeçalhos).
+
+Uso:
+    python tools/latency_compare.py --messages 200 --phones 5 --idle 3
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import host
+
+DNS_PORT = 15353
+HTTP_PORT = 18080
+WS_PORT = 18081
+
+
+def serve(mode):
+    """Processo filho: monta os servidores como o main.py e atende até ser encerrado."""
+    host.prepare_workdir()
+    from dns_server import DNSServer
+    from websocket_server import WebSocketServer
+    from web_server import WebServer
+
+    async def main():
+        dns_server = DNSServer('192.168.4.1', DNS_PORT)
+        websocket_server = WebSocketServer(WS_PORT)
+        web_server = WebServer(HTTP_PORT, websocket_server)
+        if mode == 'thread':
+            from static_services import StaticServices
+            static_services = StaticServices(dns_server)
+            static_services.start()
+            static_services.serve_http(web_server)
+            tasks = [websocket_server.run()]
+        else:
+            tasks = [dns_server.run(), web_server.run(), websocket_server.run()]
+        tasks = [asyncio.create_task(task) for task in tasks]
+        await asyncio.sleep(0.2)
+        print('pronto', file=sys.stderr, flush=True)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+
+def percentiles(samples):
+    if not samples:
+        return 'sem amostras'
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] * 1000
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000
+    return f'p50={p50:6.1f} ms p95={p95:6.1f} ms máx={samples[-1] * 1000:6.1f} ms'
+
+
+async def relay_latency(count):
+    """Mede o tempo entre o envio de uma mensagem por A e a chegada em B."""
+    sender, sender_w = await host.ws_connect(WS_PORT)
+    receiver, receiver_w = await host.ws_connect(WS_PORT)
+    await asyncio.sleep(0.2)
+    # Descartar userCount/idClient do handshake
+    while True:
+        try:
+            await asyncio.wait_for(host.ws_recv(receiver), 0.1)
+        except asyncio.TimeoutError:
+            break
+
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        await host.ws_send(sender_w, f'{{"type":"message","content":"{i}"}}')
+        while True:
+            payload = await host.ws_recv(receiver)
+            if payload.endswith(f'"{i}"}}'.encode()):
+                break
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.02)
+    sender_w.close()
+    receiver_w.close()
+    return samples
+
+
+def dns_latency(stop, samples, lost):
+    while not stop.is_set():
+        elapsed = host.dns_query(DNS_PORT)
+        if elapsed is None:
+            lost.append(1)
+        else:
+            samples.append(elapsed)
+        time.sleep(0.02)
+
+
+async def phone_load(paths, stop, joins):
+    """Um celular que entra, baixa tudo e entra de novo até o fim da medição."""
+    while not stop.is_set():
+        for path in paths:
+            response = await host.http_get(HTTP_PORT, path)
+            if not response.startswith(b'HTTP/1.1 200'):
+                raise RuntimeError(f'{path}: {response[:40]}')
+        joins.append(1)
+
+
+async def idle_preconnect(stop):
+    """Abre uma conexão e não envia nada (pré-conexão do navegador do celular)."""
+    while not stop.is_set():
+        reader, writer = await asyncio.open_connection('127.0.0.1', HTTP_PORT)
+        try:
+            await asyncio.wait_for(reader.read(), 5)
+        except asyncio.TimeoutError:
+            pass
+        writer.close()
+
+
+async def measure(count, phones, idle, paths):
+    stop_event = asyncio.Event()
+    dns_stop = threading.Event()
+    dns_samples, dns_lost, joins = [], [], []
+    dns_thread = threading.Thread(target=dns_latency, args=(dns_stop, dns_samples, dns_lost))
+    dns_thread.start()
+    load = [asyncio.create_task(phone_load(paths, stop_event, joins)) for _ in range(phones)]
+    load += [asyncio.create_task(idle_preconnect(stop_event)) for _ in range(idle)]
+    try:
+        relay = await relay_latency(count)
+    finally:
+        stop_event.set()
+        dns_stop.set()
+        for task in load:
+            task.cancel()
+        results = await asyncio.gather(*load, return_exceptions=True)
+        dns_thread.join()
+    for result in results:
+        if isinstance(result, RuntimeError):
+            raise result
+    return relay, dns_samples, len(dns_lost), len(joins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--phones', type=int, default=5, help='celulares baixando fragmentos em laço')
+    parser.add_argument('--idle', type=int, default=3, help='pré-conexões HTTP ociosas')
+    parser.add_argument('--serve', choices=('asyncio', 'thread'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    host.prepare_workdir()
+    paths = host.fragment_paths()
+    for mode in ('asyncio', 'thread'):
+        child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            while child.stderr.readline().strip() != 'pronto':
+                if child.poll() is not None:
+                    raise RuntimeError(f'servidor ({mode}) encerrou')
+            label = 'STATIC_THREAD=' + ('True ' if mode == 'thread' else 'False')
+            for load_label, phones, idle in (('sem carga', 0, 0), ('com carga', args.phones, args.idle)):
+                relay, dns, lost, joins = asyncio.run(measure(args.messages, phones, idle, paths))
+                print(f'{label} {load_label}: chat {percentiles(relay)} entradas completas={joins}')
+                print(f'{label} {load_label}:  dns {percentiles(dns)} perdidas={lost}')
+        finally:
+            child.terminate()
+            child.wait()
+
+
+if __name__ == '__main__':
+    main()
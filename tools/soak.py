@@ -0,0 +1,407 @@
+"""
+Teste longo (soak) dos três servidores com uma agenda sorteada e reproduzível.
+
+O servidor roda em um processo filho, montado como no main.py (--mode asyncio
+ou thread), com o HealthMonitor registrando a cada --sample segundos. O
+processo principal segue uma agenda de random.Random(--seed): celulares
+entrando (WebSocket + todos os fragmentos) e saindo (com ou sem frame de
+close), rajadas de mensagens, sondagens de portal cativo (HTTP e DNS) e
+conexões abortadas no meio. Dois clientes fixos medem o repasse do chat a
+cada segundo. A cada --quiet-every minutos todos saem por pouco mais de duas
+amostras, para que o HealthMonitor registre o servidor ocioso (é só aí que
+ele compara a memória com a linha de base).
+
+No filho, gc.mem_free()/gc.mem_alloc() são simulados com o tracemalloc e a
+amostra ganha "sockets" (descritores abertos). O largest_block do CPython não
+diz nada sobre fragmentação (a alocação nunca falha); ele é registrado só para
+o log ter o mesmo formato do ESP32.
+
+Ao final aponta vazamento de memória (inclinação da memória retida nas
+amostras ociosas, em KB por hora), de sockets e latência crescente (código de
+saída 1 se algo for apontado).
+
+Uso:
+    python tools/soak.py --minutes 180 --seed 1
+    python tools/soak.py --minutes 2 --sample 5 --mode thread
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+
+import host
+
+DNS_PORT = 25353
+HTTP_PORT = 28080
+WS_PORT = 28081
+HOST_HEAP = 64 * 1024 * 1024  # "Heap" simulado do filho para gc.mem_free()
+
+
+def socket_count():
+    fd_dir = '/proc/self/fd'
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return None  # Sem /proc (fora do Linux)
+    count = 0
+    for fd in fds:
+        try:
+            count += os.readlink(os.path.join(fd_dir, fd)).startswith('socket:')
+        except OSError:
+            pass  # Descritor fechado entre o listdir e o readlink (ex.: o do próprio listdir)
+    return count
+
+
+def serve(mode, sample_s):
+    """Processo filho: servidores + HealthMonitor, até ser encerrado."""
+    import gc
+    import tracemalloc
+
+    tracemalloc.start()
+    gc.mem_alloc = lambda: tracemalloc.get_traced_memory()[0]
+    gc.mem_free = lambda: HOST_HEAP - gc.mem_alloc()
+
+    host.prepare_workdir()
+    from dns_server import DNSServer
+    from health_monitor import HealthMonitor
+    from websocket_server import WebSocketServer
+    from web_server import WebServer
+
+    class SoakMonitor(HealthMonitor):
+        def sample(self):
+            sample = super().sample()
+            sample["sockets"] = socket_count()
+            return sample
+
+    async def main():
+        dns_server = DNSServer('192.168.4.1', DNS_PORT)
+        websocket_server = WebSocketServer(WS_PORT)
+        web_server = WebServer(HTTP_PORT, websocket_server)
+        if mode == 'thread':
+            from static_services import StaticServices
+            static_services = StaticServices(dns_server)
+            static_services.start()
+            static_services.serve_http(web_server)
+            tasks = [websocket_server.run()]
+        else:
+            tasks = [dns_server.run(), web_server.run(), websocket_server.run()]
+        tasks.append(SoakMonitor(websocket_server, web_server, sample_s).run())
+        tasks = [asyncio.create_task(task) for task in tasks]
+        await asyncio.sleep(0.2)
+        print('pronto', file=sys.stderr, flush=True)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+
+def parse_value(value):
+    if value == 'None':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+class Soak:
+    def __init__(self, args, paths):
+        self.args = args
+        self.paths = paths
+        self.rng = random.Random(args.seed)
+        self.phones = []        # (reader, writer, tarefa de leitura)
+        self.latencies = []     # Repasses medidos desde a última amostra
+        self.lost_probes = 0
+        self.quiet = asyncio.Event()  # Janela ociosa: ninguém conectado
+        self.errors = {}
+        self.events = {}
+
+    def count(self, event):
+        self.events[event] = self.events.get(event, 0) + 1
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def check(self, response, status):
+        # Com MAX_CONNECTIONS clientes no chat todo pedido HTTP recebe a página de limite
+        if b'Limite de Conex' in response:
+            self.count('http_limit')
+        elif not response.startswith(status):
+            self.error('http ' + response[:12].decode(errors='replace'))
+
+    async def drain(self, reader):
+        try:
+            while True:
+                await host.ws_recv(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    async def join(self):
+        if len(self.phones) >= self.args.phones:
+            return
+        # Como o loader.html: baixa tudo e só então o chat.html abre o WebSocket
+        for path in self.paths:
+            self.check(await host.http_get(HTTP_PORT, path), b'HTTP/1.1 200')
+        try:
+            reader, writer = await host.ws_connect(WS_PORT)
+        except (asyncio.IncompleteReadError, ConnectionError, RuntimeError):
+            self.count('join_refused')
+            return
+        self.phones.append((reader, writer, asyncio.create_task(self.drain(reader))))
+        self.count('join')
+
+    async def leave(self):
+        if not self.phones:
+            return
+        reader, writer, reading = self.phones.pop(self.rng.randrange(len(self.phones)))
+        if self.rng.random() < 0.5:
+            writer.write(b'\x88\x80' + os.urandom(4))  # Frame de close mascarado, sem payload
+            self.count('leave_close')
+        else:
+            self.count('leave_abrupt')
+        reading.cancel()
+        writer.close()
+
+    async def burst(self):
+        if not self.phones:
+            return
+        reader, writer, reading = self.rng.choice(self.phones)
+        for i in range(self.rng.randint(3, 10)):
+            try:
+                await host.ws_send(writer, f'{{"type":"message","content":"rajada {i}"}}')
+            except ConnectionError:
+                break
+            await asyncio.sleep(0.05)
+        self.count('burst')
+
+    async def captive_probe(self):
+        path = self.rng.choice(('/generate_204', '/connecttest.txt', '/redirect'))
+        self.check(await host.http_get(HTTP_PORT, path), b'HTTP/1.1 302')
+        if await asyncio.to_thread(host.dns_query, DNS_PORT) is None:
+            self.error('dns sem resposta')
+        self.count('captive')
+
+    async def aborted(self):
+        kind = self.rng.choice(('connect', 'partial_http', 'mid_download', 'partial_ws'))
+        port = WS_PORT if kind == 'partial_ws' else HTTP_PORT
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        if kind == 'partial_http':
+            writer.write(b'GET /fragments/fragment_0 HTTP/1.1\r\nHost: 192')
+        elif kind == 'partial_ws':
+            writer.write(b'GET / HTTP/1.1\r\nUpgrade: websocket\r\n')
+        elif kind == 'mid_download':
+            writer.write(f'GET {self.rng.choice(self.paths)} HTTP/1.1\r\n\r\n'.encode())
+            await writer.drain()
+            await reader.read(256)
+        await asyncio.sleep(self.rng.random() * 0.5)
+        writer.close()
+        self.count('aborted_' + kind)
+
+    async def quiet_window(self, stop):
+        """Todos saem e nada acontece por pouco mais de duas amostras do HealthMonitor."""
+        self.quiet.set()
+        while self.phones:
+            await self.leave()
+        try:
+            await asyncio.wait_for(stop.wait(), 2 * self.args.sample + 5)
+        except asyncio.TimeoutError:
+            pass
+        self.quiet.clear()
+        self.count('quiet')
+
+    async def schedule(self, stop):
+        actions = ((self.join, 3), (self.leave, 3), (self.burst, 4), (self.captive_probe, 3), (self.aborted, 2))
+        population = [action for action, weight in actions for _ in range(weight)]
+        next_quiet = time.monotonic() + self.args.quiet_every * 60
+        while not stop.is_set():
+            await asyncio.sleep(self.rng.expovariate(self.args.rate))
+            if time.monotonic() >= next_quiet:
+                await self.quiet_window(stop)
+                next_quiet = time.monotonic() + self.args.quiet_every * 60
+                continue
+            try:
+                await self.rng.choice(population)()
+            except (OSError, asyncio.IncompleteReadError) as e:
+                self.error(type(e).__name__)
+                print(f'erro no evento: {e!r}')
+
+    async def probe(self, stop):
+        """Dois clientes fixos: mede o repasse de uma mensagem por segundo (pausa nas janelas ociosas)."""
+        i = 0
+        while not stop.is_set():
+            if self.quiet.is_set():
+                await asyncio.sleep(0.2)
+                continue
+            sender, sender_w = await host.ws_connect(WS_PORT)
+            receiver, receiver_w = await host.ws_connect(WS_PORT)
+            while not stop.is_set() and not self.quiet.is_set():
+                i += 1
+                marker = f'"sonda {i}"}}'.encode()
+                start = time.perf_counter()
+                await host.ws_send(sender_w, f'{{"type":"message","content":"sonda {i}"}}')
+                try:
+                    while not (await asyncio.wait_for(host.ws_recv(receiver), 2)).endswith(marker):
+                        pass
+                    self.latencies.append(time.perf_counter() - start)
+                except asyncio.TimeoutError:
+                    self.lost_probes += 1
+                await asyncio.sleep(1)
+            sender_w.close()
+            receiver_w.close()
+
+
+def median(values):
+    values = sorted(v for v in values if v is not None)
+    return values[len(values) // 2] if values else None
+
+
+def leak_slope(points):
+    """Inclinação por mínimos quadrados de pontos (horas, KB), em KB/h."""
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def analyse(samples, args):
+    """Compara o primeiro com o último quarto das amostras (após o aquecimento)."""
+    samples = samples[1:]  # Primeira amostra: cache ainda enchendo
+    if len(samples) < 8:
+        print('Amostras insuficientes para análise de tendência (use um teste mais longo)')
+        return []
+    quarter = len(samples) // 4
+    first, last = samples[:quarter], samples[-quarter:]
+    flags = []
+
+    # Memória retida: só amostras ociosas, descontando o cache de arquivos e os envios pendentes
+    idle = [(s['uptime_s'] / 3600, (s['mem_alloc'] - s['cache_bytes'] - s['ws_pending']) / 1024)
+            for s in samples if not s['ws_clients'] and not s['http_active']]
+    if len(idle) >= 3:
+        slope = leak_slope(idle)
+        growth = idle[-1][1] - idle[0][1]
+        print(f'memória retida (ociosa): {growth:+.1f} KB em {len(idle)} amostras, {slope:+.1f} KB/h')
+        if slope > args.leak_kb_h and growth > args.leak_floor_kb:
+            flags.append(f'possível vazamento de memória ({slope:.1f} KB/h, {growth:+.1f} KB)')
+    else:
+        print(f'apenas {len(idle)} amostras ociosas: vazamento de memória não avaliado (aumente --minutes)')
+
+    if first[0].get('sockets') is not None:
+        socket_growth = min(s['sockets'] for s in last) - min(s['sockets'] for s in first)
+        print(f'sockets: {socket_growth:+d} entre o início e o fim')
+        if socket_growth > args.socket_leak:
+            flags.append(f'possível vazamento de sockets ({socket_growth})')
+
+    lat_first = median(s['relay_p50_ms'] for s in first)
+    lat_last = median(s['relay_p50_ms'] for s in last)
+    lag_first = median(s['loop_lag_ms'] for s in first)
+    lag_last = median(s['loop_lag_ms'] for s in last)
+    print(f'repasse p50: {lat_first} -> {lat_last} ms, atraso do laço: {lag_first} -> {lag_last} ms')
+    if lat_first is not None and lat_last is not None and \
+            lat_last > lat_first * args.lag_ratio and lat_last - lat_first > args.lag_min_ms:
+        flags.append(f'latência do repasse crescente ({lat_first} -> {lat_last} ms)')
+    if lag_first is not None and lag_last is not None and \
+            lag_last > lag_first * args.lag_ratio and lag_last - lag_first > args.lag_min_ms:
+        flags.append(f'atraso do laço crescente ({lag_first} -> {lag_last} ms)')
+    return flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=180)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mode', choices=('asyncio', 'thread'), default='asyncio',
+                        help='thread equivale a STATIC_THREAD = True')
+    parser.add_argument('--sample', type=int, default=60, help='segundos entre amostras do HealthMonitor')
+    parser.add_argument('--rate', type=float, default=2.0, help='eventos por segundo')
+    parser.add_argument('--phones', type=int, default=3, help='celulares além dos dois clientes de medição')
+    parser.add_argument('--quiet-every', type=float, default=10, help='minutos entre janelas ociosas')
+    parser.add_argument('--leak-kb-h', type=float, default=4, help='KB por hora de memória retida que contam como vazamento')
+    parser.add_argument('--leak-floor-kb', type=float, default=2, help='crescimento mínimo (KB) para apontar vazamento')
+    parser.add_argument('--socket-leak', type=int, default=2, help='sockets a mais que contam como vazamento')
+    parser.add_argument('--lag-ratio', type=float, default=2.0, help='quanto a latência pode multiplicar')
+    parser.add_argument('--lag-min-ms', type=float, default=5.0, help='aumento mínimo de latência para apontar')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.mode, args.sample)
+        return
+
+    host.prepare_workdir()
+    paths = host.fragment_paths()
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve',
+                              '--mode', args.mode, '--sample', str(args.sample)],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    while child.stderr.readline().strip() != 'pronto':
+        if child.poll() is not None:
+            raise RuntimeError('servidor encerrou antes de ficar pronto')
+
+    soak = Soak(args, paths)
+    samples, warnings = [], []
+    start = time.monotonic()
+
+    def read_log():
+        # Ler sempre a saída do filho (evita encher o pipe) e separar o log de saúde
+        for line in child.stdout:
+            if not line.startswith('[saude] '):
+                continue
+            if '=' not in line.split()[1]:
+                warnings.append(line.strip())
+                print(line.strip())
+                continue
+            sample = {key: parse_value(value) for key, value in re.findall(r'(\w+)=(\S+)', line)}
+            latencies, soak.latencies = soak.latencies, []
+            sample['relay_p50_ms'] = round(median(latencies) * 1000, 1) if latencies else None
+            samples.append(sample)
+            print(f'[{(time.monotonic() - start) / 60:6.1f} min] heap={sample["mem_alloc"] / 1024:.0f}KB '
+                  f'sockets={sample["sockets"]} largest_block={sample["largest_block"]} '
+                  f'ws_clients={sample["ws_clients"]} http_active={sample["http_active"]} '
+                  f'loop_lag={sample["loop_lag_ms"]}ms repasse_p50={sample["relay_p50_ms"]}ms',
+                  flush=True)
+
+    reader = threading.Thread(target=read_log, daemon=True)
+    reader.start()
+    # Tracebacks do filho vão para o stderr: repassar para não encher o pipe
+    threading.Thread(target=lambda: [sys.stderr.write(line) for line in child.stderr], daemon=True).start()
+
+    async def run():
+        stop = asyncio.Event()
+        tasks = [asyncio.create_task(soak.probe(stop)), asyncio.create_task(soak.schedule(stop))]
+        await asyncio.sleep(args.minutes * 60)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for reader_, writer, reading in soak.phones:
+            reading.cancel()
+            writer.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        child.terminate()
+        child.wait()
+        reader.join(1)
+
+    print(f'eventos: {dict(sorted(soak.events.items()))}')
+    print(f'erros: {soak.errors or 0}, sondas de repasse perdidas: {soak.lost_probes}')
+    flags = analyse(samples, args)
+    if soak.errors:
+        flags.append(f'respostas erradas ou conexões recusadas: {soak.errors}')
+    flags += [f'aviso do HealthMonitor: {w}' for w in warnings]
+    for flag in flags:
+        print('ALERTA: ' + flag)
+    if not flags:
+        print('Nenhuma tendência de vazamento ou lentidão encontrada')
+    sys.exit(1 if flags else 0)
+
+
+if __name__ == '__main__':
+    main()
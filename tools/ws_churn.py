@@ -0,0 +1,108 @@
+"""
+Simulação de entra-e-sai no WebSocketServer, com e sem agrupamento de envios.
+
+Clientes entram e saem (saída abrupta, sem frame de close) seguindo uma
+agenda sorteada com semente fixa, e os conectados conversam. A mesma agenda
+roda para cada janela de agrupamento (--window, em ms; 0 desativa). Para cada
+uma mostra, por segundo, frames gerados, sends (aprox. segmentos TCP) e a
+separação entre frames agrupados (entregues sem send próprio) e descartados
+(cliente saiu antes do envio), além de uma estimativa de tempo de ar.
+
+Estimativa de tempo de ar: cada send vira um quadro 802.11 com custo fixo de
+--packet-us microssegundos (preâmbulo, DIFS, backoff, SIFS e ACK; ~150 us em
+802.11g/n sem agregação) mais os bytes a --phy-mbps. É só uma ordem de
+grandeza para comparar as janelas entre si.
+
+Uso:
+    python tools/ws_churn.py --duration 30 --seed 1 --window 0 --window 20
+"""
+import argparse
+import asyncio
+import random
+
+import host
+
+from websocket_server import WebSocketServer
+
+TICK_S = 0.05
+
+
+async def client(port, messages, stop, agenda_rng):
+    """Um celular: conecta, lê tudo o que chega e conversa até ser mandado sair."""
+    reader, writer = await host.ws_connect(port)
+
+    async def drain():
+        while True:
+            await host.ws_recv(reader)
+
+    reading = asyncio.create_task(drain())
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), agenda_rng.expovariate(messages))
+            except asyncio.TimeoutError:
+                await host.ws_send(writer, '{"type":"message","content":"oi"}')
+    finally:
+        reading.cancel()
+        writer.close()
+
+
+async def simulate(window_ms, args):
+    # Mesma semente para todas as janelas: a agenda de entradas e saídas é idêntica
+    rng = random.Random(args.seed)
+    server = WebSocketServer(args.port, flush_window_ms=window_ms)
+    task = asyncio.create_task(server.run())
+    await asyncio.sleep(0.05)
+
+    clients = []  # (tarefa, evento de saída)
+    ticks = int(args.duration / TICK_S)
+    connected = 0
+    for _ in range(ticks):
+        connected += server.client_count
+        if len(clients) < args.clients and rng.random() < args.join * TICK_S:
+            stop = asyncio.Event()
+            agenda_rng = random.Random(rng.random())
+            clients.append((asyncio.create_task(client(args.port, args.messages, stop, agenda_rng)), stop))
+        if clients and rng.random() < args.leave * TICK_S:
+            done, stop = clients.pop(rng.randrange(len(clients)))
+            stop.set()
+        await asyncio.sleep(TICK_S)
+
+    for done, stop in clients:
+        stop.set()
+    await asyncio.gather(*[done for done, _ in clients], return_exceptions=True)
+    await asyncio.sleep(0.2)
+    task.cancel()
+    server.socket.close()
+    return server.send_stats(), connected / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=30, help='segundos de simulação')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=5, help='máximo de clientes ao mesmo tempo')
+    parser.add_argument('--join', type=float, default=2.0, help='entradas por segundo (tentativas)')
+    parser.add_argument('--leave', type=float, default=0.5, help='saídas por segundo')
+    parser.add_argument('--messages', type=float, default=2.0, help='mensagens por segundo por cliente')
+    parser.add_argument('--window', type=int, action='append', help='janela de agrupamento em ms (pode repetir)')
+    parser.add_argument('--packet-us', type=float, default=150, help='custo fixo de ar por quadro')
+    parser.add_argument('--phy-mbps', type=float, default=24, help='taxa física para os bytes')
+    parser.add_argument('--port', type=int, default=18081)
+    args = parser.parse_args()
+
+    print(f'{args.duration:.0f} s, semente {args.seed}, até {args.clients} clientes, '
+          f'{args.join}/s entradas, {args.leave}/s saídas, {args.messages} msg/s por cliente')
+    for window_ms in args.window or (0, 20):
+        stats, mean_clients = asyncio.run(simulate(window_ms, args))
+        seconds = args.duration
+        airtime_ms = (stats['sends'] * args.packet_us + stats['bytes'] * 8 / args.phy_mbps) / 1000
+        print(f'janela {window_ms:3d} ms: clientes médios={mean_clients:.1f} frames/s={stats["frames"] / seconds:6.1f} '
+              f'sends/s={stats["sends"] / seconds:6.1f} '
+              f'agrupados={stats["sends_saved"]} descartados={stats["frames_dropped"]} '
+              f'userCount colapsados={stats["counts_collapsed"]} '
+              f'ar≈{airtime_ms / seconds:5.2f} ms/s')
+
+
+if __name__ == '__main__':
+    main()